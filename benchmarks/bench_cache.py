@@ -0,0 +1,86 @@
+"""Size, encode and decode time of the persistent game info cache, original JSON format against cache_format.
+
+Game infos are made from a synthetic library (tests/fake_backend.py records, every 5th one a DLC sharing
+namespace of its game). Decoding is the part of handshake_complete done on every plugin start.
+Results are printed as JSON (or written to --output) so they can be compared between revisions.
+
+Usage: python benchmarks/bench_cache.py [--sizes 1000,5000,20000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tests'))
+
+from fake_backend import FakeEpicBackend, FakeBackendConfig  # noqa: E402
+from cache_format import encode_game_info, decode_game_info  # noqa: E402
+from library import Library  # noqa: E402
+
+
+def game_infos(size):
+    library = Library()
+    for record in FakeEpicBackend(FakeBackendConfig(library_size=size, dlc_every=5))._generate_library():
+        library.update(record['appName'], record['namespace'], record['catalogItem']['title'])
+    return library
+
+
+def encode_legacy(library):
+    return json.dumps({
+        entry.app_name: {'namespace': entry.namespace, 'app_name': entry.app_name, 'title': entry.title}
+        for entry in library
+    })
+
+
+def decode_legacy(value):
+    return [(info['namespace'], info['app_name'], info['title']) for info in json.loads(value).values()]
+
+
+def best_ms(func, arg, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        samples.append(time.perf_counter() - start)
+    return min(samples) * 1e3
+
+
+def run(args):
+    results = {'config': vars(args), 'runs': []}
+    for size in args.sizes:
+        infos = game_infos(size)
+        run = {'library_size': size}
+        for name, encode, decode in (('legacy', encode_legacy, decode_legacy),
+                                     ('current', encode_game_info, decode_game_info)):
+            value = encode(infos)
+            assert decode(value) == [(entry.namespace, entry.app_name, entry.title) for entry in infos]
+            # Galaxy JSON-encodes the whole persistent cache again when it is pushed
+            run[name] = {
+                'pushed_bytes': len(json.dumps(value)),
+                'encode_ms': best_ms(encode, infos, args.repeat),
+                'decode_ms': best_ms(decode, value, args.repeat)
+            }
+        results['runs'].append(run)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=lambda value: [int(size) for size in value.split(',')],
+                        default=[1000, 5000, 20000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    results = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(results)
+    else:
+        print(results)
+
+
+if __name__ == '__main__':
+    main()
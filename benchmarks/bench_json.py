@@ -0,0 +1,147 @@
+"""Decode and encode time of the plugin's JSON payloads with every available codec of json_codec.
+
+Payloads are sized as real ones: GraphQL library pages and whole libraries (tests/fake_backend.py records),
+game manifests (.item files, one per installed game, as written by the launcher), LauncherInstalled.dat and
+the plugin's persistent cache values. Decoding starts from bytes as read from a response or a file; for the
+standard library decoding of str is measured as well (`loads_str_ms`), as `response.json()` and text mode
+files used to decode before parsing.
+Results are printed as JSON (or written to --output) so they can be compared between revisions.
+
+Usage: python benchmarks/bench_json.py [--sizes 1000,5000,20000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tests'))
+
+from fake_backend import FakeEpicBackend, FakeBackendConfig  # noqa: E402
+from json_codec import CODECS, StdlibCodec  # noqa: E402
+
+
+def manifest(i):
+    app_name = f'Game{i}'
+    return {
+        'FormatVersion': 0,
+        'bIsIncompleteInstall': False,
+        'LaunchCommand': '',
+        'LaunchExecutable': f'Binaries/Win64/{app_name}.exe',
+        'ManifestLocation': f'C:\\ProgramData\\Epic\\EpicGamesLauncher\\Data\\Manifests\\{app_name}',
+        'bIsApplication': True,
+        'bIsExecutable': True,
+        'bIsManaged': False,
+        'bNeedsValidation': False,
+        'bRequiresAuth': True,
+        'bCanRunOffline': False,
+        'AppName': app_name,
+        'BaseURLs': [f'https://epicgames-download1.akamaized.net/Builds/Org/{i:08x}/default'] * 4,
+        'BuildLabel': 'Live',
+        'CatalogItemId': f'{i:032x}',
+        'CatalogNamespace': f'ns{i:08x}',
+        'AppCategories': ['public', 'games', 'applications'],
+        'ChunkDbs': [],
+        'CompatibleApps': [],
+        'DisplayName': f'Game Number {i}',
+        'InstallLocation': f'C:\\Program Files\\Epic Games\\{app_name}',
+        'InstallSize': 1024 ** 3 + i,
+        'InstallTags': [],
+        'InstallComponents': [],
+        'HostInstallationGuid': f'{i:032X}',
+        'PrereqIds': [],
+        'StagingLocation': f'C:\\Program Files\\Epic Games\\{app_name}/.egstore/bps',
+        'TechnicalType': 'games,applications',
+        'VaultThumbnailUrl': '',
+        'VaultTitleText': '',
+        'InstallSessionId': f'{i:032X}',
+        'AppVersionString': f'1.0.{i}-x64',
+        'MainGameCatalogNamespace': f'ns{i:08x}',
+        'MainGameCatalogItemId': f'{i:032x}',
+        'MainGameAppName': app_name
+    }
+
+
+def launcher_installed(size):
+    return {'InstallationList': [
+        {
+            'InstallLocation': f'C:\\Program Files\\Epic Games\\Game{i}',
+            'AppName': f'Game{i}',
+            'AppID': 0,
+            'AppVersion': f'1.0.{i}-x64'
+        } for i in range(size)
+    ]}
+
+
+def payloads(size):
+    library = FakeEpicBackend(FakeBackendConfig(library_size=size, dlc_every=5))._generate_library()
+    page = {'data': {'Launcher': {'libraryItems': {
+        'records': library[:100], 'responseMetadata': {'nextCursor': '100'}
+    }}}}
+    installed = min(size, 500)
+    return {
+        'library_page': page,
+        'library': library,
+        'manifests': [manifest(i) for i in range(installed)],
+        'launcher_installed': launcher_installed(installed),
+        'game_time_cache': {item['appName']: {'time_played': 60 * i, 'last_played': 1600000000 + i}
+                            for i, item in enumerate(library)}
+    }
+
+
+def best_ms(func, arg, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        samples.append(time.perf_counter() - start)
+    return min(samples) * 1e3
+
+
+def measure(codec, name, obj, repeat):
+    # manifests are separate files, each decoded on its own
+    objects = obj if name == 'manifests' else [obj]
+    encoded = [json.dumps(o).encode() for o in objects]
+    for o, data in zip(objects, encoded):
+        assert codec.loads(data) == o
+
+    result = {
+        'bytes': sum(len(data) for data in encoded),
+        'loads_ms': best_ms(lambda items: [codec.loads(data) for data in items], encoded, repeat),
+        'dumps_ms': best_ms(lambda items: [codec.dumps(o) for o in items], objects, repeat)
+    }
+    if codec is StdlibCodec:
+        texts = [data.decode() for data in encoded]
+        result['loads_str_ms'] = best_ms(lambda items: [codec.loads(text) for text in items], texts, repeat)
+    return result
+
+
+def run(args):
+    results = {'config': vars(args), 'codecs': list(CODECS), 'runs': []}
+    for size in args.sizes:
+        run = {'library_size': size}
+        for name, obj in payloads(size).items():
+            run[name] = {codec_name: measure(codec, name, obj, args.repeat) for codec_name, codec in CODECS.items()}
+        results['runs'].append(run)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=lambda value: [int(size) for size in value.split(',')],
+                        default=[1000, 5000, 20000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    results = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(results)
+    else:
+        print(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Compares full parsing of LauncherInstalled.dat with the fingerprint cached LauncherInstalledParser.
+
+Usage: python benchmarks/bench_launcher_installed.py [number_of_games]
+"""
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from local import LauncherInstalledParser  # noqa: E402
+
+
+def make_launcher_installed(path, games):
+    content = {"InstallationList": [
+        {
+            "InstallLocation": f"C:\\Program Files\\Epic Games\\Game{i}",
+            "AppName": f"Game{i}",
+            "AppID": 0,
+            "AppVersion": "1.0.0-x64"
+        } for i in range(games)
+    ]}
+    with open(path, 'w') as f:
+        json.dump(content, f)
+
+
+def main(games=500, number=1000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'LauncherInstalled.dat')
+        make_launcher_installed(path, games)
+
+        parser = LauncherInstalledParser()
+        parser._path = path
+        parser.parse()
+
+        def touch():
+            os.utime(path)
+            return parser.file_has_changed()
+
+        results = {
+            'uncached parse': timeit.timeit(lambda: parser._parse_content(parser._load_file()), number=number),
+            'cached parse': timeit.timeit(parser.parse, number=number),
+            'mtime touch, same content': timeit.timeit(touch, number=number),
+        }
+    for name, total in results.items():
+        print(f'{name:>28}: {total / number * 1e6:10.1f} us/call ({games} games)')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,151 @@
+"""Memory and CPU of the in-memory library model during owned games refreshes, previous model against library.Library.
+
+The previous model kept `GameInfo` dataclasses by app name, Galaxy `Game` objects of owned games by game id and
+rebuilt a list of `EpicDlc` on every refresh, matching each game against all DLCs. Both models are fed the same
+synthetic library (tests/fake_backend.py records, every 5th one a DLC) parsed from JSON on every refresh as the
+backend response is. Reported are memory retained after refreshes (the response itself is dropped), peak memory
+during a refresh and CPU time of a refresh. Before Python 3.9 (no tracemalloc.reset_peak) the peak is the highest one
+since the first refresh, an upper bound.
+Results are printed as JSON (or written to --output) so they can be compared between revisions.
+
+Usage: python benchmarks/bench_library.py [--sizes 1000,5000,20000] [--refreshes 2]
+"""
+import argparse
+import dataclasses
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tests'))
+
+from galaxy.api.consts import LicenseType  # noqa: E402
+from galaxy.api.types import Game, Dlc, LicenseInfo  # noqa: E402
+
+from fake_backend import FakeEpicBackend, FakeBackendConfig  # noqa: E402
+from library import Library, DlcEntry  # noqa: E402
+
+
+@dataclasses.dataclass
+class GameInfo:
+    namespace: str
+    app_name: str
+    title: str
+
+
+@dataclasses.dataclass
+class EpicDlc:
+    parent_id: str
+    dlc_id: str
+    dlc_title: str
+
+
+def is_game(record):
+    paths = [category['path'] for category in record['catalogItem']['categories']]
+    return 'games' in paths and 'applications' in paths
+
+
+class PreviousModel:
+    def __init__(self):
+        self.game_info_cache = {}
+        self.owned_games = {}
+
+    def refresh(self, records):
+        dlcs = [
+            EpicDlc(record['catalogItem']['mainGameItem']['id'], record['catalogItemId'], record['catalogItem']['title'])
+            for record in records if record['catalogItem'].get('mainGameItem')
+        ]
+        for record in records:
+            if not is_game(record):
+                continue
+            games_dlcs = []
+            for dlc in dlcs:
+                if record['catalogItemId'] == dlc.parent_id:
+                    games_dlcs.append(Dlc(dlc.dlc_id, dlc.dlc_title, LicenseInfo(LicenseType.SinglePurchase)))
+                if record['catalogItemId'] == dlc.dlc_id:
+                    break
+            else:
+                self.game_info_cache[record['appName']] = GameInfo(
+                    record['namespace'], record['appName'], record['catalogItem']['title']
+                )
+                game = Game(record['appName'], record['catalogItem']['title'], games_dlcs,
+                            LicenseInfo(LicenseType.SinglePurchase))
+                self.owned_games.setdefault(game.game_id, game)
+
+
+class LibraryModel:
+    def __init__(self):
+        self.library = Library()
+
+    def refresh(self, records):
+        dlcs = defaultdict(list)
+        for record in records:
+            if record['catalogItem'].get('mainGameItem'):
+                dlcs[record['catalogItem']['mainGameItem']['id']].append(
+                    DlcEntry(record['catalogItemId'], record['catalogItem']['title'])
+                )
+        dlc_ids = {dlc.dlc_id for game_dlcs in dlcs.values() for dlc in game_dlcs}
+        for record in records:
+            if is_game(record) and record['catalogItemId'] not in dlc_ids:
+                entry = self.library.update(record['appName'], record['namespace'], record['catalogItem']['title'],
+                                            tuple(dlcs.get(record['catalogItemId'], ())))
+                entry.owned = True
+
+
+def measure(model_class, payload, refreshes):
+    gc.collect()
+    tracemalloc.start()
+    model = model_class()
+    cpu_times, peak = [], 0
+    for _ in range(refreshes):
+        records = json.loads(payload)
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        start = time.process_time()
+        model.refresh(records)
+        cpu_times.append(time.process_time() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+        del records
+        gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {'retained_kb': retained / 1024, 'refresh_peak_kb': peak / 1024,
+            'refresh_cpu_ms': min(cpu_times) * 1e3}
+
+
+def run(args):
+    results = {'config': vars(args), 'runs': []}
+    for size in args.sizes:
+        library = FakeEpicBackend(FakeBackendConfig(library_size=size, dlc_every=5))._generate_library()
+        payload = json.dumps(library)
+        results['runs'].append({
+            'library_size': size,
+            'previous': measure(PreviousModel, payload, args.refreshes),
+            'library': measure(LibraryModel, payload, args.refreshes)
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=lambda value: [int(size) for size in value.split(',')],
+                        default=[1000, 5000, 20000])
+    parser.add_argument('--refreshes', type=int, default=2)
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    results = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(results)
+    else:
+        print(results)
+
+
+if __name__ == '__main__':
+    main()
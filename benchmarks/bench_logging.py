@@ -0,0 +1,108 @@
+"""Cost of logging raw library pages during one owned games refresh, before and after log_utils.Payload.
+
+Logs every page of a synthetic library (tests/fake_backend.py records) the way EpicClient.get_owned_games does,
+once formatting the whole page as before and once through Payload, to a log file at INFO level as Galaxy does
+and with INFO filtered out. For each variant it reports CPU time, peak traced memory and bytes written.
+Results are printed as JSON (or written to --output) so they can be compared between revisions.
+
+Usage: python benchmarks/bench_logging.py [--sizes 1000,5000,20000] [--page-size 100] [--repeat 5] [--limit 1024]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tests'))
+
+from fake_backend import FakeEpicBackend, FakeBackendConfig  # noqa: E402
+from log_utils import Payload  # noqa: E402
+
+log = logging.getLogger('bench')
+
+
+def library_pages(size, page_size):
+    library = FakeEpicBackend(FakeBackendConfig(library_size=size))._generate_library()
+    return [
+        {'data': {'Launcher': {'libraryItems': {
+            'records': library[start:start + page_size],
+            'responseMetadata': {'nextCursor': str(start + page_size) if start + page_size < size else None}
+        }}}}
+        for start in range(0, size, page_size)
+    ]
+
+
+def log_whole(page, limit):
+    log.info(page)
+
+
+def log_payload(page, limit):
+    log.info('Library page %s', Payload(page, limit))
+
+
+def measure(pages, log_page, limit, repeat):
+    """CPU time is the best of `repeat` refreshes; memory is measured in a separate one, as tracing slows it down"""
+    cpu_times = []
+    for _ in range(repeat):
+        start = time.process_time()
+        for page in pages:
+            log_page(page, limit)
+        cpu_times.append(time.process_time() - start)
+    tracemalloc.start()
+    for page in pages:
+        log_page(page, limit)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'cpu_ms': min(cpu_times) * 1e3, 'peak_traced_kb': peak / 1024}
+
+
+def run(args):
+    results = {'config': vars(args), 'runs': []}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'plugin.log')
+        handler = logging.FileHandler(path)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        log.addHandler(handler)
+        log.propagate = False
+        for size in args.sizes:
+            pages = library_pages(size, args.page_size)
+            run = {'library_size': size, 'pages': len(pages)}
+            for level_name, level in (('info', logging.INFO), ('filtered', logging.WARNING)):
+                log.setLevel(level)
+                for variant, log_page in (('whole', log_whole), ('payload', log_payload)):
+                    with open(path, 'w'):
+                        pass  # truncate
+                    handler.stream.seek(0)
+                    result = measure(pages, log_page, args.limit, args.repeat)
+                    handler.flush()
+                    result['log_bytes_per_refresh'] = os.path.getsize(path) // (args.repeat + 1)
+                    run[f'{level_name}_{variant}'] = result
+            results['runs'].append(run)
+        handler.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=lambda value: [int(size) for size in value.split(',')],
+                        default=[1000, 5000, 20000])
+    parser.add_argument('--page-size', type=int, default=100, help='library records per GraphQL page')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--limit', type=int, default=1024, help='Payload limit, characters')
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    results = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(results)
+    else:
+        print(results)
+
+
+if __name__ == '__main__':
+    main()
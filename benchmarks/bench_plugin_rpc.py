@@ -0,0 +1,281 @@
+"""End-to-end JSON-RPC load benchmark of EpicPlugin against the local fake Epic backend (tests/fake_backend.py).
+
+Plays the Galaxy client side over a real TCP connection to an in-process plugin and, for every library size, measures:
+    import_owned_games, start_game_times_import (until game_times_import_finished),
+    start_local_size_import (until local_size_import_finished, on synthetic manifests), import_friends
+    and launch_game (until the plugin issues the launcher command; the launcher itself is stubbed).
+For each operation it reports latency percentiles, peak RSS of the process and event loop lag during the operation.
+Results are printed as JSON (or written to --output) so they can be compared between revisions.
+
+Usage: python benchmarks/bench_plugin_rpc.py [--sizes 100,1000,5000,20000] [--repeat 3] [--latency 0.02]
+                                             [--friends 100] [--log-file plugin.log]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import psutil
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tests'))
+
+from fake_backend import FakeEpicBackend, FakeBackendConfig  # noqa: E402
+
+
+class GalaxyClient:
+    """Minimal Galaxy side of the plugin JSON-RPC connection"""
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._last_id = 0
+        self._pending = {}  # {request id: future}
+        self._waiters = {}  # {notification method: future}
+        self._reading = asyncio.get_event_loop().create_task(self._read())
+
+    async def _read(self):
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                return
+            message = json.loads(line)
+            if 'id' in message and message['id'] in self._pending:
+                future = self._pending.pop(message['id'])
+                if 'error' in message:
+                    future.set_exception(RuntimeError(message['error']))
+                else:
+                    future.set_result(message.get('result'))
+            elif message.get('method') in self._waiters:
+                self._waiters.pop(message['method']).set_result(message.get('params'))
+
+    def _write(self, message):
+        self._writer.write((json.dumps(message) + '\n').encode())
+
+    async def request(self, method, params=None):
+        self._last_id += 1
+        request_id = str(self._last_id)
+        future = self._pending[request_id] = asyncio.get_event_loop().create_future()
+        self._write({'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params or {}})
+        return await future
+
+    def notify(self, method, params=None):
+        self._write({'jsonrpc': '2.0', 'method': method, 'params': params or {}})
+
+    def expect_notification(self, method):
+        future = self._waiters[method] = asyncio.get_event_loop().create_future()
+        return future
+
+    async def close(self):
+        self._writer.close()
+        self._reading.cancel()
+
+
+class StubLocalClient:
+    """Replaces the Epic launcher, `exec` only reports the moment the plugin issued the command"""
+    def __init__(self):
+        self.executed = None
+
+    async def exec(self, cmd):
+        self.executed.set_result(time.perf_counter())
+
+
+class RssSampler:
+    def __init__(self, interval=0.005):
+        self._interval = interval
+        self._process = psutil.Process()
+        self._stop = threading.Event()
+        self.peak = 0
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            self.peak = max(self.peak, self._process.memory_info().rss)
+
+    def __enter__(self):
+        self.peak = self._process.memory_info().rss
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+class LoopLagMonitor:
+    """Measures how late a 1 ms periodic callback is woken up while the loop is busy with the plugin"""
+    def __init__(self, interval=0.001):
+        self._interval = interval
+        self._task = None
+        self.lags = []
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self._interval)
+            self.lags.append(time.perf_counter() - start - self._interval)
+
+    def __enter__(self):
+        self._task = asyncio.get_event_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {}
+    return {
+        'n': len(samples),
+        'p50_ms': samples[int(0.5 * (len(samples) - 1))] * 1e3,
+        'p90_ms': samples[int(0.9 * (len(samples) - 1))] * 1e3,
+        'p99_ms': samples[int(0.99 * (len(samples) - 1))] * 1e3,
+        'max_ms': samples[-1] * 1e3
+    }
+
+
+def write_manifests(directory, game_ids):
+    for game_id in game_ids:
+        with open(os.path.join(directory, f'{game_id}.item'), 'w') as f:
+            json.dump({
+                'AppName': game_id,
+                'DisplayName': game_id,
+                'InstallLocation': os.path.join(directory, game_id),
+                'LaunchExecutable': f'Binaries/{game_id}.exe',
+                'InstallSize': 1024 ** 3
+            }, f)
+
+
+async def measure(operation, repeat):
+    latencies, lags, peak_rss = [], [], 0
+    for _ in range(repeat):
+        with RssSampler() as rss, LoopLagMonitor() as lag:
+            start = time.perf_counter()
+            end = await operation()
+            latencies.append((end or time.perf_counter()) - start)
+        lags.extend(lag.lags)
+        peak_rss = max(peak_rss, rss.peak)
+    return {
+        'latency': percentiles(latencies),
+        'peak_rss_mb': peak_rss / 2 ** 20,
+        'loop_lag': percentiles(lags)
+    }
+
+
+async def run_size(size, args, port):
+    backend = FakeEpicBackend(FakeBackendConfig(
+        library_size=size, page_size=args.page_size, friends=args.friends, latency=args.latency
+    ))
+    await backend.start(port=port)
+    # the same port for every size, consts are read only once
+    os.environ['EPIC_BACKEND_URL'] = backend.url
+    # imported only now so consts pick up the fake backend URL
+    import local
+    from plugin import EpicPlugin
+
+    connected = asyncio.get_event_loop().create_future()
+    server = await asyncio.start_server(
+        lambda reader, writer: connected.set_result((reader, writer)), '127.0.0.1', 0, limit=2 ** 30
+    )
+    galaxy_port = server.sockets[0].getsockname()[1]
+    plugin_reader, plugin_writer = await asyncio.open_connection('127.0.0.1', galaxy_port)
+    plugin = EpicPlugin(plugin_reader, plugin_writer, 'token')
+    plugin._local_client = local_client = StubLocalClient()
+
+    async def no_search(game_id, timeout):
+        pass
+    plugin._local_provider.search_process = no_search
+
+    plugin_task = asyncio.get_event_loop().create_task(plugin.run())
+    client = GalaxyClient(*await connected)
+    results = {'library_size': size}
+    try:
+        await client.request('initialize_cache', {'data': {}})
+        await client.request('init_authentication', {'stored_credentials': {'refresh_token': 'REFRESH_TOKEN'}})
+
+        owned_games = []
+
+        async def import_owned_games():
+            owned_games[:] = (await client.request('import_owned_games'))['owned_games']
+
+        async def import_finished(method, notification):
+            finished = client.expect_notification(notification)
+            await client.request(method, {'game_ids': [game['game_id'] for game in owned_games]})
+            await finished
+
+        async def game_times():
+            await import_finished('start_game_times_import', 'game_times_import_finished')
+
+        async def local_sizes():
+            await import_finished('start_local_size_import', 'local_size_import_finished')
+
+        async def friends():
+            await client.request('import_friends')
+
+        async def launch_game():
+            local_client.executed = asyncio.get_event_loop().create_future()
+            client.notify('launch_game', {'game_id': owned_games[0]['game_id']})
+            return await local_client.executed
+
+        with tempfile.TemporaryDirectory() as manifests:
+            local.GAME_MANIFESTS_PATH = manifests
+            results['import_owned_games'] = await measure(import_owned_games, args.repeat)
+            results['owned_games'] = len(owned_games)
+            write_manifests(manifests, [game['game_id'] for game in owned_games])
+            operations = {'game_times': game_times, 'local_sizes': local_sizes, 'friends': friends,
+                          'launch_game': launch_game}
+            for name, operation in operations.items():
+                results[name] = await measure(operation, args.repeat)
+        results['backend_requests'] = dict(backend.requests)
+    finally:
+        await client.request('shutdown')
+        await client.close()
+        await plugin_task
+        server.close()
+        await backend.stop()
+    return results
+
+
+async def run(args):
+    results = {'config': vars(args), 'runs': []}
+    port = args.port
+    for size in args.sizes:
+        results['runs'].append(await run_size(size, args, port))
+        port = int(os.environ['EPIC_BACKEND_URL'].rsplit(':', 1)[1])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=lambda value: [int(size) for size in value.split(',')],
+                        default=[100, 1000, 5000, 20000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--page-size', type=int, default=100, help='library records per GraphQL page')
+    parser.add_argument('--latency', type=float, default=0.0, help='fake backend latency per request, seconds')
+    parser.add_argument('--friends', type=int, default=100)
+    parser.add_argument('--port', type=int, default=0, help='fake backend port, any free one by default')
+    parser.add_argument('--log-file', help='log plugin at INFO level to this file, as Galaxy does')
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+    if args.log_file:
+        logging.basicConfig(filename=args.log_file, level=logging.INFO)
+    else:
+        # otherwise the first module level logging call would send galaxy INFO logs to stderr
+        logging.basicConfig(handlers=[logging.NullHandler()])
+
+    results = json.dumps(asyncio.get_event_loop().run_until_complete(run(args)), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(results)
+    else:
+        print(results)
+
+
+if __name__ == '__main__':
+    main()
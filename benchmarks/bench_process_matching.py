@@ -0,0 +1,69 @@
+"""Compares matching processes against watched games: per-app substring scan vs the install path index.
+
+Usage: python benchmarks/bench_process_matching.py [number_of_games] [number_of_processes]
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from process_watcher import ProcessWatcher  # noqa: E402
+
+
+class FakeProcess:
+    def __init__(self, exe):
+        self._exe = exe
+        self.exe_calls = 0
+
+    def exe(self):
+        self.exe_calls += 1
+        return self._exe
+
+
+def legacy_match(watched_apps, proc):
+    """Matching as done before the path index was introduced"""
+    for game in watched_apps:
+        path = proc.exe()
+        if not path:
+            return False
+        elif game.dir in path:
+            watched_apps[game].add(proc)
+            return True
+    return False
+
+
+def make_processes(games, processes):
+    root = os.path.join(os.sep, 'Games')
+    installed = {f'Game{i}': os.path.join(root, f'Game{i}') for i in range(games)}
+    system = os.path.join(os.sep, 'usr', 'bin')
+    procs = [FakeProcess(os.path.join(system, f'daemon{i}')) for i in range(processes - games // 10)]
+    procs += [FakeProcess(os.path.join(path, 'Binaries', 'Game.exe')) for path in random.sample(list(installed.values()), games // 10)]
+    random.shuffle(procs)
+    return installed, procs
+
+
+def main(games=500, processes=1000, number=5):
+    random.seed(0)
+    installed, procs = make_processes(games, processes)
+    watcher = ProcessWatcher('EpicGamesLauncher')
+    watcher._exit_watcher = None  # fake processes have no pid to watch; only matching is measured
+    watcher.watched_games = installed
+    match = watcher._ProcessWatcher__match_process
+
+    results = {}
+    for name, func in [('legacy substring scan', lambda p: legacy_match(watcher._watched_apps, p)), ('path index', match)]:
+        for proc in procs:
+            proc.exe_calls = 0
+        total = timeit.timeit(lambda: [func(proc) for proc in procs], number=number)
+        exe_calls = sum(proc.exe_calls for proc in procs) // number
+        results[name] = (total / number, exe_calls)
+
+    for name, (per_scan, exe_calls) in results.items():
+        print(f'{name:>22}: {per_scan * 1e3:9.2f} ms/scan, {exe_calls:7} exe() calls/scan '
+              f'({games} games, {processes} processes)')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:3]))
@@ -0,0 +1,29 @@
+"""Compares full process scans: psutil.process_iter against reading /proc directly (Linux only).
+
+Usage: python benchmarks/bench_process_scanner.py [number_of_scans]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from process_scanner import ProcfsProcessScanner, PsutilProcessScanner  # noqa: E402
+
+
+def main(number=20):
+    if not ProcfsProcessScanner.is_supported():
+        sys.exit('/proc is not available on this platform')
+
+    processes = len(os.listdir('/proc'))
+    for name, factory in [('psutil.process_iter', PsutilProcessScanner), ('/proc', ProcfsProcessScanner)]:
+        scanner = factory()
+        cold = timeit.timeit(lambda: list(scanner.scan()), number=1)
+        warm = timeit.timeit(lambda: list(scanner.scan()), number=number) / number
+        delta = timeit.timeit(lambda: list(scanner.scan(new_only=True)), number=number) / number
+        print(f'{name:>20}: cold {cold * 1e3:8.2f} ms, warm {warm * 1e3:8.2f} ms/scan, '
+              f'new only {delta * 1e3:8.2f} ms/scan (~{processes} /proc entries)')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
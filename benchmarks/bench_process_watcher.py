@@ -0,0 +1,170 @@
+"""Synthetic process tree benchmark of ProcessWatcher (Linux only).
+
+Creates fake install directories with real executables (copies of `sleep`) and a fake launcher (copy of `sh`)
+with configurable number of children and grandchildren, then measures:
+    _search_in_all (full and new only), _search_in_children, get_running_games,
+    game start detection latency (pool_until_game_start) and game exit detection latency.
+Results are printed as JSON (or written to --output) so they can be compared between revisions.
+
+Usage: python benchmarks/bench_process_watcher.py [--games 100] [--children 20] [--grandchildren 5] [--repeat 20]
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from process_watcher import ProcessWatcher  # noqa: E402
+
+LAUNCHER_NAME = 'EpicGamesLauncher'
+LAUNCHER_SCRIPT = '''
+i=0
+while [ $i -lt {children} ]; do
+    "{helper}" -c 'j=0; while [ $j -lt {grandchildren} ]; do "{sleep}" 1000 & j=$((j+1)); done; wait' &
+    i=$((i+1))
+done
+while read cmd; do $cmd & done
+'''
+
+
+def copy_executable(source, directory, name):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    shutil.copy2(source, path)
+    return path
+
+
+def make_tree(root, games):
+    sleep = shutil.which('sleep')
+    sh = shutil.which('sh')
+    installed = {}
+    for i in range(games):
+        game_dir = os.path.join(root, 'Games', f'Game{i}')
+        copy_executable(sleep, os.path.join(game_dir, 'Binaries'), f'Game{i}')
+        installed[f'Game{i}'] = game_dir
+    launcher_dir = os.path.join(root, 'Epic Games', 'Launcher')
+    return {
+        'installed': installed,
+        'launcher': copy_executable(sh, launcher_dir, LAUNCHER_NAME),
+        'helper': copy_executable(sh, launcher_dir, 'LauncherHelper'),
+        'sleep': copy_executable(sleep, launcher_dir, 'LauncherWorker')
+    }
+
+
+def timings(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return summary(samples)
+
+
+def summary(samples):
+    samples = sorted(samples)
+    return {
+        'n': len(samples),
+        'min_ms': samples[0] * 1e3,
+        'median_ms': statistics.median(samples) * 1e3,
+        'p90_ms': samples[int(0.9 * (len(samples) - 1))] * 1e3,
+        'max_ms': samples[-1] * 1e3
+    }
+
+
+async def detection_latencies(watcher, launcher, tree, repeat):
+    start_samples, exit_samples = [], []
+    for i in range(repeat):
+        game_id = f'Game{i % len(tree["installed"])}'
+        exe = os.path.join(tree['installed'][game_id], 'Binaries', game_id)
+        start = time.perf_counter()
+        launcher.stdin.write(f'{exe} 1000\n'.encode())
+        launcher.stdin.flush()
+        if not await watcher.pool_until_game_start(game_id, timeout=10, sint=0.5, lint=2):
+            raise RuntimeError(f'{game_id} was not detected')
+        start_samples.append(time.perf_counter() - start)
+
+        exited = asyncio.Event()
+        watcher.on_process_exit = lambda app_id: exited.set()
+        proc = next(iter(watcher._watched_apps[game_id]))
+        start = time.perf_counter()
+        proc.kill()
+        while game_id in watcher.get_running_games(check_under_launcher=False):
+            try:
+                await asyncio.wait_for(exited.wait(), 0.001)
+            except asyncio.TimeoutError:
+                watcher.begin_tick()
+        exit_samples.append(time.perf_counter() - start)
+    return summary(start_samples), summary(exit_samples)
+
+
+async def run(args):
+    with tempfile.TemporaryDirectory() as root:
+        tree = make_tree(root, args.games)
+        script = LAUNCHER_SCRIPT.format(
+            children=args.children, grandchildren=args.grandchildren, helper=tree['helper'], sleep=tree['sleep']
+        )
+        launcher = subprocess.Popen([tree['launcher'], '-c', script], stdin=subprocess.PIPE, start_new_session=True)
+        try:
+            time.sleep(0.5 + 0.01 * args.children * args.grandchildren)
+            watcher = ProcessWatcher(LAUNCHER_NAME)
+            watcher.watched_games = tree['installed']
+
+            def full_scan():
+                watcher._scanner.forget()
+                watcher._search_in_all()
+
+            def children_scan():
+                watcher.begin_tick()
+                watcher._search_in_children(watcher._launcher)
+
+            def running_games():
+                watcher.begin_tick()
+                watcher.get_running_games(check_under_launcher=True)
+
+            results = {
+                'config': vars(args),
+                'processes': len([pid for pid in os.listdir('/proc') if pid.isdigit()]),
+                'search_in_all_full': timings(full_scan, args.repeat),
+                'search_in_all_new_only': timings(watcher._search_in_all, args.repeat),
+            }
+            if not watcher.is_launcher_running():
+                raise RuntimeError('Fake launcher was not detected')
+            results['search_in_children'] = timings(children_scan, args.repeat)
+            results['get_running_games'] = timings(running_games, args.repeat)
+            results['start_detection'], results['exit_detection'] = \
+                await detection_latencies(watcher, launcher, tree, min(args.repeat, args.games))
+            results['exit_backend'] = 'pidfd' if watcher._exit_watcher else 'polling'
+        finally:
+            os.killpg(launcher.pid, 9)
+            launcher.wait()
+    return results
+
+
+def main():
+    if not sys.platform.startswith('linux'):
+        sys.exit('This benchmark runs on Linux only')
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--children', type=int, default=20)
+    parser.add_argument('--grandchildren', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    results = json.dumps(asyncio.get_event_loop().run_until_complete(run(args)), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(results)
+    else:
+        print(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,14 @@ import logging as log
 
 from galaxy.api.errors import UnknownBackendResponse
 
+from consts import (
+    ACCOUNT_SERVICE_URL, LAUNCHER_SERVICE_URL, CATALOG_SERVICE_URL, FRIENDS_SERVICE_URL,
+    GRAPHQL_SERVICE_URL, STORE_CONTENT_URL
+)
 from definitions import Asset, CatalogItem
+from log_utils import Payload
+from json_codec import read_json
+from metrics import registry
 
 
 class EpicClient:
@@ -14,14 +21,11 @@ class EpicClient:
         return user_info[0]["displayName"]
 
     async def get_users_info(self, account_ids):
-        url = (
-            "https://account-public-service-prod03.ol.epicgames.com"
-            "/account/api/public/account?"
-        )
+        url = ACCOUNT_SERVICE_URL + "/account/api/public/account?"
         for account_id in account_ids:
             url = url + "&accountId=" + account_id
         response = await self._http_client.get(url)
-        result = await response.json()
+        result = await read_json(response)
         try:
             return result
         except KeyError:
@@ -36,24 +40,20 @@ class EpicClient:
         }
         requests = []
         for platform in platforms:
-            url = (
-                "https://launcher-public-service-prod06.ol.epicgames.com"
-                "/launcher/api/public/assets/" + platform
-            )
+            url = LAUNCHER_SERVICE_URL + "/launcher/api/public/assets/" + platform
             requests.append(self._http_client.get(url, params=params))
 
         responses = await asyncio.gather(*requests)
         assets = set()
         for response in responses:
-            items = await response.json()
+            items = await read_json(response)
             assets.update(self._parse_assets(items))
 
         return list(assets)
 
     async def get_catalog_items_with_id(self, namespace, catalog_id):
         url = (
-            "https://catalog-public-service-prod06.ol.epicgames.com"
-            "/catalog/api/shared/namespace/{}/bulk/items"
+            CATALOG_SERVICE_URL + "/catalog/api/shared/namespace/{}/bulk/items"
         ).format(namespace)
         params = {
             "id": catalog_id,
@@ -61,22 +61,21 @@ class EpicClient:
             "locale": "en-US"
         }
         response = await self._http_client.get(url, params=params)
-        items = await response.json()
+        items = await read_json(response)
         try:
             item = self._parse_catalog_item(items)
         except UnknownBackendResponse:
-            log.exception(f"Can not parse backend response for {url} for {catalog_id}: {items}")
+            log.exception("Can not parse backend response for %s for %s: %s", url, catalog_id, Payload(items))
             raise UnknownBackendResponse
         else:
             return item
 
     async def get_friends_list(self):
         url = (
-            "https://friends-public-service-prod06.ol.epicgames.com/friends/api/public/"
-            "friends/{}"
+            FRIENDS_SERVICE_URL + "/friends/api/public/friends/{}"
         ).format(self._http_client.account_id)
         response = await self._http_client.get(url)
-        items = await response.json()
+        items = await read_json(response)
         return items
 
     @staticmethod
@@ -97,7 +96,7 @@ class EpicClient:
             categories = [category["path"] for category in item["categories"]]
             return CatalogItem(item["id"], item["title"], categories)
         except (IndexError, KeyError) as e:
-            log.warning(f"Could not parse catalog item in {items}, error {repr(e)}")
+            log.warning("Could not parse catalog item in %s, error %r", Payload(items), e)
             raise UnknownBackendResponse()
 
     async def get_product_store_info(self, query):
@@ -120,8 +119,8 @@ class EpicClient:
                               "namespace": "epic",
                               "query": query}
                 }
-        response = await self._http_client.post("https://graphql.epicgames.com/graphql", json=data)
-        response = await response.json()
+        response = await self._http_client.post(GRAPHQL_SERVICE_URL + "/graphql", json=data)
+        response = await read_json(response)
         return response
 
     async def get_playtime(self):
@@ -136,12 +135,12 @@ class EpicClient:
                 "variables": {"accountId": f"{self._http_client.account_id}"}
                 }
 
-        response = await self._http_client.post("https://graphql.epicgames.com/graphql", json=data, graph=True)
+        response = await self._http_client.post(GRAPHQL_SERVICE_URL + "/graphql", json=data, graph=True)
         return response
 
     async def get_productmapping(self):
-        response = await self._http_client.get("https://store-content.ak.epicgames.com/api/content/productmapping")
-        response = await response.json()
+        response = await self._http_client.get(STORE_CONTENT_URL + "/api/content/productmapping")
+        response = await read_json(response)
         return response
 
     async def get_owned_games(self,cursor=""):
@@ -195,8 +194,9 @@ class EpicClient:
                     }''',
                         "variables": {"locale": "en-US", "cursor": cursor, "excludeNs": ["ue"]}
                                   }
-        response = await self._http_client.post("https://graphql.epicgames.com/graphql", json=data, graph=True)
-        log.info(response)
+        response = await self._http_client.post(GRAPHQL_SERVICE_URL + "/graphql", json=data, graph=True)
+        registry.counter('library_pages_total').inc()
+        log.info('Library page %s', Payload(response))
         cursor = response['data']['Launcher']['libraryItems']['responseMetadata']['nextCursor']
         if cursor:
             next_page = await self.get_owned_games(cursor)
@@ -0,0 +1,52 @@
+"""Encoding of game info kept in Galaxy persistent cache.
+
+Values are versioned as `<version>:<payload>`; a value without the prefix is the original format (version 1),
+plain JSON `{app_name: {"namespace": ..., "app_name": ..., "title": ...}}`.
+Version 2 is columnar JSON compressed with zlib and base64 encoded; namespaces are stored once and referenced by index:
+    {"namespaces": [unique namespaces], "namespace": [index per game], "app_name": [...], "title": [...]}
+"""
+import base64
+import zlib
+from typing import Iterable, List, Tuple
+
+import json_codec
+
+GAME_INFO_VERSION = 2
+_GAME_INFO_PREFIX = f'{GAME_INFO_VERSION}:'
+
+
+def is_current_game_info(value: str) -> bool:
+    return value.startswith(_GAME_INFO_PREFIX)
+
+
+def encode_game_info(game_infos: Iterable) -> str:
+    """:param game_infos: objects with `namespace`, `app_name` and `title`, e.g. library entries"""
+    namespaces = {}
+    columns = {'namespace': [], 'app_name': [], 'title': []}
+    for info in game_infos:
+        columns['namespace'].append(namespaces.setdefault(info.namespace, len(namespaces)))
+        columns['app_name'].append(info.app_name)
+        columns['title'].append(info.title)
+    columns['namespaces'] = list(namespaces)
+    data = zlib.compress(json_codec.dumpb(columns))
+    return _GAME_INFO_PREFIX + base64.b64encode(data).decode('ascii')
+
+
+def decode_game_info(value: str) -> List[Tuple[str, str, str]]:
+    """:returns: (namespace, app name, title) of games from a value of any known version
+    :raises ValueError: if value is malformed or of unknown version
+    """
+    try:
+        if value.startswith('{'):
+            return [(info['namespace'], info['app_name'], info['title']) for info in json_codec.loads(value).values()]
+        version, _, payload = value.partition(':')
+        if version != str(GAME_INFO_VERSION):
+            raise ValueError(f'Unknown game info cache version {version}')
+        columns = json_codec.loads(zlib.decompress(base64.b64decode(payload)))
+        namespaces = columns['namespaces']
+        return [
+            (namespaces[namespace], app_name, title)
+            for namespace, app_name, title in zip(columns['namespace'], columns['app_name'], columns['title'])
+        ]
+    except (KeyError, IndexError, TypeError, AttributeError, zlib.error) as e:
+        raise ValueError(f'Malformed game info cache: {repr(e)}') from e
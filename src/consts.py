@@ -30,6 +30,23 @@ elif sys.platform == 'darwin':
 LAUNCHER_INSTALLED_PATH = os.path.join(_program_data, 'Epic', 'UnrealEngineLauncher', 'LauncherInstalled.dat')
 GAME_MANIFESTS_PATH = os.path.join(_program_data, 'Epic', 'EpicGamesLauncher', 'Data', 'Manifests')
 
+# Base URL of a single stand-in for all Epic backend services, e.g. http://localhost:8080 for tests/fake_backend.py;
+# lets the plugin run offline for end-to-end and performance tests
+BACKEND_URL_OVERRIDE = os.getenv('EPIC_BACKEND_URL')
+
+
+def backend_url(url):
+    return BACKEND_URL_OVERRIDE or url
+
+
+ACCOUNT_SERVICE_URL = backend_url("https://account-public-service-prod03.ol.epicgames.com")
+LAUNCHER_SERVICE_URL = backend_url("https://launcher-public-service-prod06.ol.epicgames.com")
+CATALOG_SERVICE_URL = backend_url("https://catalog-public-service-prod06.ol.epicgames.com")
+FRIENDS_SERVICE_URL = backend_url("https://friends-public-service-prod06.ol.epicgames.com")
+GRAPHQL_SERVICE_URL = backend_url("https://graphql.epicgames.com")
+STORE_CONTENT_URL = backend_url("https://store-content.ak.epicgames.com")
+EPIC_ID_SERVICE_URL = backend_url("https://www.epicgames.com")
+
 AUTH_URL = r"https://www.epicgames.com/id/login"
 AUTH_REDIRECT_URL = r"https://epicgames.com/account/personal"
 
@@ -0,0 +1,59 @@
+import asyncio
+import os
+import sys
+import logging as log
+
+import psutil
+
+
+class PidfdExitWatcher:
+    """Linux backend reporting process exit the moment it happens.
+    Every watched process gets a pidfd registered as a reader in asyncio loop; pidfd becomes readable on exit.
+    Processes which cannot be watched this way (old kernel, already dead) are left for polling.
+    """
+    def __init__(self, on_exit):
+        self._on_exit = on_exit
+        self._fds = {}  # {psutil.Process: pidfd}
+
+    @staticmethod
+    def is_supported():
+        return sys.platform.startswith('linux') and hasattr(os, 'pidfd_open')
+
+    def is_watching(self, proc):
+        return proc in self._fds
+
+    def watch(self, proc: psutil.Process):
+        """:returns: True if exit of `proc` will be reported, False if it has to be polled"""
+        if proc in self._fds:
+            return True
+        try:
+            loop = asyncio.get_event_loop()
+            fd = os.pidfd_open(proc.pid)
+        except (OSError, RuntimeError) as e:
+            log.debug(f'Cannot watch {proc} exit with pidfd: {repr(e)}')
+            return False
+        # pid could have been reused between finding the process and opening pidfd
+        if not proc.is_running():
+            os.close(fd)
+            return False
+        try:
+            loop.add_reader(fd, self._exited, proc)
+        except NotImplementedError:
+            os.close(fd)
+            return False
+        self._fds[proc] = fd
+        return True
+
+    def unwatch(self, proc):
+        fd = self._fds.pop(proc, None)
+        if fd is not None:
+            asyncio.get_event_loop().remove_reader(fd)
+            os.close(fd)
+
+    def close(self):
+        for proc in list(self._fds):
+            self.unwatch(proc)
+
+    def _exited(self, proc):
+        self.unwatch(proc)
+        self._on_exit(proc)
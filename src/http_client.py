@@ -9,6 +9,12 @@ from galaxy.api.errors import (
     AuthenticationRequired, UnknownBackendResponse
 )
 
+from consts import ACCOUNT_SERVICE_URL, EPIC_ID_SERVICE_URL
+from http_tracing import HttpTracer, retrying
+from metrics import registry
+from log_utils import Payload
+from json_codec import read_json
+
 
 def basic_auth_credentials(login, password):
     credentials = "{}:{}".format(login, password)
@@ -33,7 +39,7 @@ class AuthenticatedHttpClient:
     _LAUNCHER_PASSWORD = "daafbccc737745039dffe53d94fc76cf"
     _BASIC_AUTH_CREDENTIALS = basic_auth_credentials(_LAUNCHER_LOGIN, _LAUNCHER_PASSWORD)
 
-    _OAUTH_URL = "https://account-public-service-prod03.ol.epicgames.com/account/api/oauth/token"
+    _OAUTH_URL = ACCOUNT_SERVICE_URL + "/account/api/oauth/token"
 
     LAUNCHER_USER_AGENT = (
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -50,7 +56,8 @@ class AuthenticatedHttpClient:
         self._auth_lost_callback = None
         self._store_credentials = store_credentials_callback
         self._cookie_jar = CookieJar()
-        self._session = create_client_session(cookie_jar=self._cookie_jar)
+        self._tracer = HttpTracer()
+        self._session = create_client_session(cookie_jar=self._cookie_jar, trace_configs=[self._tracer.trace_config])
         self._session.headers = {}
         self._session.headers["User-Agent"] = self.LAUNCHER_USER_AGENT
         self._refreshing_task = None
@@ -67,8 +74,8 @@ class AuthenticatedHttpClient:
     async def retrieve_exchange_code(self):
         xsrf_token = None
         old_cookies_values = [cookie.value for cookie in self._session.cookie_jar]
-        await self.request('GET', "https://www.epicgames.com/id/api/authenticate")
-        await self.request('GET', "https://www.epicgames.com/id/api/csrf")
+        await self.request('GET', EPIC_ID_SERVICE_URL + "/id/api/authenticate")
+        await self.request('GET', EPIC_ID_SERVICE_URL + "/id/api/csrf")
         cookies = [cookie for cookie in self._session.cookie_jar]
         cookies_to_set = dict()
 
@@ -80,7 +87,7 @@ class AuthenticatedHttpClient:
                 xsrf_token = new_cookie.value
 
         self._cookie_jar = CookieJar()
-        self._session = create_client_session(cookie_jar=self._cookie_jar)
+        self._session = create_client_session(cookie_jar=self._cookie_jar, trace_configs=[self._tracer.trace_config])
         self.update_cookies(cookies_to_set)
         headers = {
             "X-Epic-Event-Action": "login",
@@ -90,8 +97,8 @@ class AuthenticatedHttpClient:
             "X-XSRF-TOKEN": xsrf_token,
             "Referer": "https://www.epicgames.com/id/login/welcome"
         }
-        response = await self.request('POST', "https://www.epicgames.com/id/api/exchange/generate", headers=headers)
-        response = await response.json()
+        response = await self.request('POST', EPIC_ID_SERVICE_URL + "/id/api/exchange/generate", headers=headers)
+        response = await read_json(response)
         return response['code']
 
     async def authenticate_with_exchange_code(self, exchange_code):
@@ -117,8 +124,13 @@ class AuthenticatedHttpClient:
     def refresh_token(self):
         return self._refresh_token
 
+    @property
+    def tracer(self):
+        """Per endpoint latency and payload size statistics, see HttpTracer"""
+        return self._tracer
+
     async def _validate_graph_response(self, response):
-        response = await response.json()
+        response = await read_json(response)
         if "errors" in response:
             for error in response["errors"]:
                 if '401' in error["message"]:
@@ -134,7 +146,7 @@ class AuthenticatedHttpClient:
                 return await self._validate_graph_response(await method(*args, **kwargs))
             return await method(*args, **kwargs)
         except Exception as e:
-            logging.exception(f"Received exception on authorized request: {repr(e)}")
+            logging.exception("Received exception on authorized request: %s", Payload(e))
             try:
                 if not self._refreshing_task or self._refreshing_task.done():
                     self._refreshing_task = asyncio.create_task(self._refresh_tokens())
@@ -143,17 +155,20 @@ class AuthenticatedHttpClient:
                 while not self._refreshing_task.done():
                     await asyncio.sleep(0.2)
             except AuthenticationRequired as e:
-                logging.exception(f"Failed to refresh tokens, received: {repr(e)}")
+                logging.exception("Failed to refresh tokens, received: %s", Payload(e))
+                registry.counter('http_auth_lost_total').inc()
                 if self._auth_lost_callback:
                     self._auth_lost_callback()
                 raise
             except Exception as e:
-                logging.exception(f"Got exception {repr(e)}")
+                logging.exception("Got exception %s", Payload(e))
                 raise
 
-            if 'graph' in kwargs:
-                return await self._validate_graph_response(await method(*args, **kwargs))
-            return await method(*args, **kwargs)
+            registry.counter('http_retries_total').inc()
+            with retrying():
+                if 'graph' in kwargs:
+                    return await self._validate_graph_response(await method(*args, **kwargs))
+                return await method(*args, **kwargs)
 
     async def get(self, *args, **kwargs):
         return await self.do_request(self._authorized_get, *args, **kwargs)
@@ -162,11 +177,13 @@ class AuthenticatedHttpClient:
         return await self.do_request(self._authorized_post, *args, **kwargs)
 
     async def close(self):
+        self._tracer.log_summary()
         await self._session.close()
         logging.debug('http client session closed')
 
     async def _refresh_tokens(self):
         logging.info("Refreshing token")
+        registry.counter('http_token_refreshes_total').inc()
         await self._authenticate("refresh_token", self._refresh_token)
 
     async def _authenticate(self, grant_type, secret):
@@ -188,10 +205,11 @@ class AuthenticatedHttpClient:
                     logging.error(e)
                     if e.status == 400:  # override 400 meaning for auth purpose
                         raise AuthenticationRequired()
+                    raise
         except AuthenticationRequired as e:
             logging.exception(f"Authentication failed, grant_type: {grant_type}, exception: {repr(e)}")
             raise AuthenticationRequired()
-        result = await response.json()
+        result = await read_json(response)
         try:
             self._access_token = result["access_token"]
             self._refresh_token = result["refresh_token"]
@@ -0,0 +1,153 @@
+import contextvars
+import logging as log
+import re
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+import aiohttp
+from yarl import URL
+
+from metrics import RollingHistogram, registry
+
+# logical endpoint names by URL path prefix, the first match wins
+_ENDPOINTS = (
+    ('/account/api/oauth/token', 'oauth'),
+    ('/account/', 'account'),
+    ('/launcher/', 'assets'),
+    ('/catalog/', 'catalog'),
+    ('/friends/', 'friends'),
+    ('/api/content/productmapping', 'productmapping'),
+    ('/graphql', 'graphql'),
+    ('/id/api/', 'id'),
+)
+_GRAPHQL_OPERATION = re.compile(rb'query\s+(\w+)')
+_OPERATION_LOOKUP_SIZE = 512  # GraphQL operation name is expected within that many first bytes of request body
+
+_retry = contextvars.ContextVar('http_retry', default=False)
+
+
+@contextmanager
+def retrying():
+    """Requests made within this context are traced as retries of their endpoint"""
+    token = _retry.set(True)
+    try:
+        yield
+    finally:
+        _retry.reset(token)
+
+
+def endpoint_name(url):
+    path = URL(url).path
+    for prefix, name in _ENDPOINTS:
+        if path.startswith(prefix):
+            return name
+    return 'other'
+
+
+class EndpointStats:
+    """Timings (seconds) and response body sizes (bytes) of one logical endpoint.
+    `dns` and `connect` are observed only for requests which opened a new connection; `ttfb` lasts until response
+    headers, `total` until the response body is read. `errors` counts failed requests by HTTP status or exception.
+    """
+    def __init__(self, window):
+        self.dns = RollingHistogram(window)
+        self.connect = RollingHistogram(window)
+        self.ttfb = RollingHistogram(window)
+        self.total = RollingHistogram(window)
+        self.body_size = RollingHistogram(window)
+        self.errors = Counter()
+
+    def to_dict(self):
+        return {
+            'dns': self.dns.to_dict(),
+            'connect': self.connect.to_dict(),
+            'ttfb': self.ttfb.to_dict(),
+            'total': self.total.to_dict(),
+            'body_size': self.body_size.to_dict(),
+            'errors': dict(self.errors)
+        }
+
+
+class HttpTracer:
+    """Collects per endpoint statistics of requests made by sessions created with its `trace_config`.
+    Endpoints are named after the service, GraphQL ones also after the operation (`graphql:libraryQuery`);
+    retries of a request (see `retrying`) are kept apart under `<endpoint>#retry`.
+    """
+    def __init__(self, window=600):
+        self.endpoints = defaultdict(lambda: EndpointStats(window))
+        self.trace_config = aiohttp.TraceConfig()
+        self.trace_config.on_request_start.append(self._on_request_start)
+        self.trace_config.on_request_chunk_sent.append(self._on_request_chunk_sent)
+        self.trace_config.on_dns_resolvehost_start.append(self._on_dns_start)
+        self.trace_config.on_dns_resolvehost_end.append(self._on_dns_end)
+        self.trace_config.on_connection_create_start.append(self._on_connect_start)
+        self.trace_config.on_connection_create_end.append(self._on_connect_end)
+        self.trace_config.on_request_end.append(self._on_request_end)
+        self.trace_config.on_request_exception.append(self._on_request_exception)
+        self.trace_config.on_response_chunk_received.append(self._on_response_body)
+
+    @staticmethod
+    def _name(ctx):
+        name = ctx.endpoint
+        if ctx.operation:
+            name += ':' + ctx.operation
+        if ctx.retry:
+            name += '#retry'
+        return name
+
+    async def _on_request_start(self, session, ctx, params):
+        ctx.start = time.perf_counter()
+        ctx.endpoint = endpoint_name(params.url)
+        ctx.operation = None
+        ctx.retry = _retry.get()
+        ctx.dns = ctx.connect = None
+
+    async def _on_request_chunk_sent(self, session, ctx, params):
+        if ctx.endpoint == 'graphql' and ctx.operation is None:
+            match = _GRAPHQL_OPERATION.search(params.chunk[:_OPERATION_LOOKUP_SIZE])
+            ctx.operation = match.group(1).decode() if match else ''
+
+    async def _on_dns_start(self, session, ctx, params):
+        ctx.dns_start = time.perf_counter()
+
+    async def _on_dns_end(self, session, ctx, params):
+        ctx.dns = time.perf_counter() - ctx.dns_start
+
+    async def _on_connect_start(self, session, ctx, params):
+        ctx.connect_start = time.perf_counter()
+
+    async def _on_connect_end(self, session, ctx, params):
+        ctx.connect = time.perf_counter() - ctx.connect_start
+
+    def _observe_connection(self, ctx):
+        stats = self.endpoints[self._name(ctx)]
+        if ctx.dns is not None:
+            stats.dns.observe(ctx.dns)
+        if ctx.connect is not None:
+            stats.connect.observe(ctx.connect)
+        return stats
+
+    async def _on_request_end(self, session, ctx, params):
+        self._observe_connection(ctx).ttfb.observe(time.perf_counter() - ctx.start)
+
+    async def _on_request_exception(self, session, ctx, params):
+        error = params.exception
+        status = error.status if isinstance(error, aiohttp.ClientResponseError) else type(error).__name__
+        self._observe_connection(ctx).errors[status] += 1
+        registry.counter('http_errors_total', endpoint=ctx.endpoint, status=status).inc()
+
+    async def _on_response_body(self, session, ctx, params):
+        # aiohttp reports the whole body at once when response is read
+        stats = self.endpoints[self._name(ctx)]
+        total = time.perf_counter() - ctx.start
+        stats.total.observe(total)
+        stats.body_size.observe(len(params.chunk))
+        registry.histogram('http_request_seconds', endpoint=ctx.endpoint).observe(total)
+        registry.counter('http_response_bytes_total', endpoint=ctx.endpoint).inc(len(params.chunk))
+
+    def log_summary(self):
+        for name, stats in sorted(self.endpoints.items()):
+            errors = f', errors {dict(stats.errors)}' if stats.errors else ''
+            log.debug(f'HTTP {name}: total [{stats.total}], ttfb [{stats.ttfb}], connect [{stats.connect}], '
+                      f'body size [{stats.body_size}]{errors}')
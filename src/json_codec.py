@@ -0,0 +1,92 @@
+"""JSON codec of the plugin's I/O paths: backend responses, launcher files, persistent cache and sidecar pipe.
+
+orjson is used when installed, the standard library json otherwise; EPIC_JSON_CODEC=json forces the latter.
+`loads` takes bytes as read from a file, pipe or HTTP response, orjson parses them without decoding to str first.
+`dumps` returns str, `dumpb` UTF-8 bytes; both are compact and encode dataclasses and enums as Galaxy JSONEncoder does.
+"""
+import dataclasses
+import json
+import os
+import logging as log
+from enum import Enum
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_CODEC_ENV = 'EPIC_JSON_CODEC'
+_UTF8_BOM = b'\xef\xbb\xbf'
+
+
+def _default(o):
+    if dataclasses.is_dataclass(o):
+        # filter None values
+        return dataclasses.asdict(o, dict_factory=lambda elements: {k: v for k, v in elements if v is not None})
+    if isinstance(o, Enum):
+        return o.value
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+class StdlibCodec:
+    name = 'json'
+    _encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False, default=_default)
+
+    @staticmethod
+    def loads(data):
+        return json.loads(data)
+
+    @classmethod
+    def dumps(cls, obj) -> str:
+        return cls._encoder.encode(obj)
+
+    @classmethod
+    def dumpb(cls, obj) -> bytes:
+        return cls._encoder.encode(obj).encode()
+
+
+class OrjsonCodec:
+    name = 'orjson'
+    # dataclasses go through `_default` to drop None values; keys other than str are converted as json does
+    _OPTIONS = orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    @staticmethod
+    def loads(data):
+        # orjson rejects BOM which json tolerates in bytes, files written by Windows tools may have one
+        if data[:3] == _UTF8_BOM:
+            data = data[3:]
+        return orjson.loads(data)
+
+    @classmethod
+    def dumps(cls, obj) -> str:
+        return orjson.dumps(obj, default=_default, option=cls._OPTIONS).decode()
+
+    @classmethod
+    def dumpb(cls, obj) -> bytes:
+        return orjson.dumps(obj, default=_default, option=cls._OPTIONS)
+
+
+CODECS = {StdlibCodec.name: StdlibCodec}
+if orjson:
+    CODECS[OrjsonCodec.name] = OrjsonCodec
+
+
+def _codec_from_environment():
+    name = os.environ.get(JSON_CODEC_ENV)
+    if name and name not in CODECS:
+        log.warning(f'JSON codec {name} is not available, using one of {list(CODECS)}')
+    return CODECS.get(name) or CODECS.get(OrjsonCodec.name, StdlibCodec)
+
+
+codec = _codec_from_environment()
+loads = codec.loads
+dumps = codec.dumps
+dumpb = codec.dumpb
+
+
+async def read_json(response):
+    """Decodes body of aiohttp `response`, None if it is empty (as `response.json()` does)"""
+    body = await response.read()
+    if not body or body.isspace():
+        return None
+    return loads(body)
@@ -0,0 +1,79 @@
+import sys
+from typing import Iterable, Optional, Tuple
+
+from galaxy.api.consts import LicenseType
+from galaxy.api.types import Game, Dlc, LicenseInfo
+
+
+class DlcEntry:
+    __slots__ = ('dlc_id', 'title')
+
+    def __init__(self, dlc_id, title):
+        self.dlc_id = dlc_id
+        self.title = title
+
+    def __eq__(self, other):
+        return isinstance(other, DlcEntry) and (self.dlc_id, self.title) == (other.dlc_id, other.title)
+
+    def __repr__(self):
+        return f'DlcEntry({self.dlc_id!r}, {self.title!r})'
+
+
+class LibraryEntry:
+    """Game of the user's library; `owned` is set once the game has been reported to Galaxy"""
+    __slots__ = ('app_name', 'namespace', 'title', 'dlcs', 'owned')
+
+    def __init__(self, app_name, namespace, title, dlcs=(), owned=False):
+        self.app_name = app_name
+        self.namespace = namespace
+        self.title = title
+        self.dlcs = dlcs
+        self.owned = owned
+
+    def to_game(self) -> Game:
+        license_info = LicenseInfo(LicenseType.SinglePurchase)
+        return Game(self.app_name, self.title, [Dlc(dlc.dlc_id, dlc.title, license_info) for dlc in self.dlcs],
+                    license_info)
+
+    def __repr__(self):
+        return f'LibraryEntry({self.app_name!r}, {self.namespace!r}, {self.title!r}, {self.dlcs!r}, {self.owned!r})'
+
+
+class Library:
+    """Games of the user's library indexed by app name (Galaxy game id).
+    Entries of games seen in any refresh, also restored from persistent cache, are kept so that
+    their namespace and title are known without asking backend. App names and namespaces are interned,
+    namespaces repeat among DLCs and app names among all the plugin's maps of game ids.
+    `changed` is set whenever namespace or title of some game has changed, the owner clears it after saving.
+    """
+    def __init__(self):
+        self._entries = {}  # {app name: LibraryEntry}
+        self.changed = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries.values())
+
+    def get(self, app_name) -> Optional[LibraryEntry]:
+        return self._entries.get(app_name)
+
+    def load(self, game_infos: Iterable[Tuple[str, str, str]]):
+        """:param game_infos: (namespace, app name, title) of games known from previous sessions"""
+        for namespace, app_name, title in game_infos:
+            app_name = sys.intern(app_name)
+            self._entries[app_name] = LibraryEntry(app_name, sys.intern(namespace), title)
+
+    def update(self, app_name, namespace, title, dlcs=()) -> LibraryEntry:
+        entry = self._entries.get(app_name)
+        if entry is None:
+            app_name = sys.intern(app_name)
+            entry = self._entries[app_name] = LibraryEntry(app_name, sys.intern(namespace), title)
+            self.changed = True
+        elif entry.namespace != namespace or entry.title != title:
+            entry.namespace = sys.intern(namespace)
+            entry.title = title
+            self.changed = True
+        entry.dlcs = dlcs
+        return entry
@@ -1,6 +1,6 @@
 import asyncio
 import subprocess
-import json
+import hashlib
 import logging as log
 from collections import defaultdict
 import os.path
@@ -9,6 +9,8 @@ from galaxy.api.types import LocalGameState
 
 from consts import LAUNCHER_INSTALLED_PATH, SYSTEM, System, LAUNCHER_PROCESS_IDENTIFIER, GAME_MANIFESTS_PATH
 from process_watcher import ProcessWatcher
+from metrics import registry
+import json_codec
 
 if SYSTEM == System.WINDOWS:
     import winreg
@@ -21,48 +23,98 @@ elif SYSTEM == System.MACOS:
 import time
 
 
+def get_launch_executables(manifests: dict) -> dict:
+    """:returns:    {app_name: full path of its LaunchExecutable}"""
+    executables = {}
+    for app_name, manifest in manifests.items():
+        try:
+            if manifest['LaunchExecutable']:
+                executables[app_name] = os.path.join(manifest['InstallLocation'], manifest['LaunchExecutable'])
+        except (KeyError, TypeError) as e:
+            log.debug(f'No launch executable in {app_name} manifest: {repr(e)}')
+    return executables
+
+
 def parse_manifests() -> dict:
     manifests = {}
-    for item in os.listdir(GAME_MANIFESTS_PATH):
-        item_path = os.path.join(GAME_MANIFESTS_PATH, item)
-        if item_path.endswith('.item'):
-            with open(item_path, 'r') as f:
-                manifest = json.load(f)
-                manifests[manifest['AppName']] = manifest
+    with registry.timer('manifests_parse_seconds'):
+        for item in os.listdir(GAME_MANIFESTS_PATH):
+            item_path = os.path.join(GAME_MANIFESTS_PATH, item)
+            if item_path.endswith('.item'):
+                with open(item_path, 'rb') as f:
+                    manifest = json_codec.loads(f.read())
+                    manifests[manifest['AppName']] = manifest
+    registry.gauge('manifests').set(len(manifests))
     return manifests
 
 
 class LauncherInstalledParser:
+    """Keeps the last parsed content of LauncherInstalled.dat together with its fingerprint (size, hash).
+    The file is re-read only when its mtime changes and re-parsed only when its content really differs."""
     def __init__(self):
         self._path = LAUNCHER_INSTALLED_PATH
         self._last_modified = None
+        self._fingerprint = None
+        self._installed_games = None
+        self._unconsumed_change = False
 
     def file_has_changed(self):
+        changed = self._refresh() or self._unconsumed_change
+        self._unconsumed_change = False
+        return changed
+
+    def _refresh(self):
+        """:returns: True if file content differs from the previously parsed one"""
         try:
             stat = os.stat(self._path)
         except FileNotFoundError:
-            return False
+            if self._fingerprint is None:
+                return False
+            # deleted file lists no games
+            self._last_modified = None
+            self._fingerprint = None
+            self._installed_games = {}
+            return True
         except Exception as e:
             log.exception(f'Stating {self._path} has failed: {str(e)}')
             raise RuntimeError('Stating failed:' + str(e))
-        else:
-            if stat.st_mtime != self._last_modified:
-                self._last_modified = stat.st_mtime
-                return True
+
+        if stat.st_mtime == self._last_modified:
             return False
+        self._last_modified = stat.st_mtime
 
-    def _load_file(self):
-        content = {}
+        raw = self._read_file()
+        registry.counter('launcher_installed_reads_total').inc()
+        fingerprint = self._get_fingerprint(raw)
+        if fingerprint == self._fingerprint:
+            log.debug(f'{self._path} has been touched but its content is the same')
+            return False
+        self._fingerprint = fingerprint
+        self._installed_games = self._parse_content(json_codec.loads(raw) if raw else {})
+        registry.counter('launcher_installed_parses_total').inc()
+        return True
+
+    @staticmethod
+    def _get_fingerprint(raw):
+        if raw is None:
+            return None
+        return len(raw), hashlib.blake2b(raw, digest_size=16).digest()
+
+    def _read_file(self):
         try:
-            with open(self._path, 'r') as f:
-                content = json.load(f)
+            with open(self._path, 'rb') as f:
+                return f.read()
         except FileNotFoundError as e:
             log.debug(str(e))
-        return content
+            return None
 
-    def parse(self):
+    def _load_file(self):
+        raw = self._read_file()
+        return json_codec.loads(raw) if raw else {}
+
+    @staticmethod
+    def _parse_content(content):
         installed_games = {}
-        content = self._load_file()
         game_list = content.get('InstallationList', [])
         for entry in game_list:
             app_name = entry.get('AppName', None)
@@ -71,17 +123,36 @@ class LauncherInstalledParser:
             installed_games[entry['AppName']] = entry['InstallLocation']
         return installed_games
 
+    def parse(self):
+        """:returns: copy of cached installed games; file is parsed again only if its content has changed"""
+        if self._refresh():
+            self._unconsumed_change = True
+        if self._installed_games is None:
+            self._installed_games = self._parse_content(self._load_file())
+        return dict(self._installed_games)
+
 
 class LocalGamesProvider:
-    def __init__(self):
+    def __init__(self, notification_window=1.0, max_wait=5.0):
+        """
+        :param notification_window  seconds a game state has to stay unchanged before it is reported as updated
+        :param max_wait             seconds after the first unreported change its net state is reported
+                                    even if the state keeps changing
+        """
         self._parser = LauncherInstalledParser()
         self._ps_watcher = ProcessWatcher(LAUNCHER_PROCESS_IDENTIFIER)
+        self._ps_watcher.on_process_exit = self._on_process_exit
         self._games = defaultdict(lambda: LocalGameState.None_)
-        self._updated_games = set()
+        self._notification_window = notification_window
+        self._max_wait = max_wait
+        self._pending_updates = {}  # {game_id: [time of the first change, time of the last change, number of changes]}
+        self._notified_states = {}
+        self._suppressed_updates = 0
         self._was_installed = dict()
         self._was_running = set()
         self._first_run = True
         self._status_updater = None
+        self.on_games_updated = None  # optional callback called when updates are ready before the next check
 
     @property
     def is_client_running(self):
@@ -104,15 +175,55 @@ class LocalGamesProvider:
         return self._games
 
     async def search_process(self, game_id, timeout):
-        await self._ps_watcher.pool_until_game_start(game_id, timeout, sint=0.5, lint=2)
+        """:returns: True if the game process has been found within `timeout`"""
+        return bool(await self._ps_watcher.pool_until_game_start(game_id, timeout, sint=0.5, lint=2))
+
+    @property
+    def process_state(self):
+        return self._ps_watcher.get_state()
+
+    def restore_process_state(self, state):
+        return self._ps_watcher.restore_state(state)
+
+    @property
+    def launch_latencies(self):
+        """{game_id: Histogram} of time between launch request and finding the game process"""
+        return self._ps_watcher.launch_latencies
 
     def is_game_running(self, game_id):
         return self._ps_watcher._is_app_tracked_and_running(game_id)
 
+    @property
+    def suppressed_updates(self):
+        """Number of state changes folded or dropped instead of being reported"""
+        return self._suppressed_updates
+
     def consume_updated_games(self):
-        tmp = self._updated_games.copy()
-        self._updated_games.clear()
-        return tmp
+        """Returns ids of games which state has settled for the notification window (or has been changing
+        for `max_wait`) and differs from the one returned previously"""
+        now = time.time()
+        updated = set()
+        for id_, (first_changed_at, changed_at, changes) in list(self._pending_updates.items()):
+            if now - changed_at < self._notification_window and now - first_changed_at < self._max_wait:
+                continue
+            del self._pending_updates[id_]
+            state = self._games[id_]
+            if self._notified_states.get(id_, LocalGameState.None_) == state:
+                self._suppressed_updates += changes
+                log.debug(f'Dropping {changes} state changes of {id_}; net state {state} is already reported')
+                continue
+            self._suppressed_updates += changes - 1
+            self._notified_states[id_] = state
+            updated.add(id_)
+        return updated
+
+    def _mark_updated(self, id_, immediate=False):
+        """:param immediate  the change is certain (not a flapping check), report it without the notification window"""
+        if self._first_run:
+            return
+        now = time.time()
+        first_changed_at, _, changes = self._pending_updates.get(id_, (now, None, 0))
+        self._pending_updates[id_] = [first_changed_at, 0 if immediate else now, changes + 1]
 
     def setup(self):
         log.info('Running local games provider setup')
@@ -120,13 +231,18 @@ class LocalGamesProvider:
         self.check_for_running()
         loop = asyncio.get_event_loop()
         self._status_updater = loop.create_task(self._endless_status_checker())
+        self._notified_states = dict(self._games)
         self._first_run = False
 
+    async def wait_ready(self):
+        """`setup` is synchronous so games are known as soon as it returns"""
+
     async def _endless_status_checker(self):
         log.info('Starting endless status checker')
         counter = 0
         while True:
             try:
+                self._ps_watcher.begin_tick()
                 self.check_for_installed()
                 if 0 == counter % 21:
                     await self.parse_all_procs_if_needed()
@@ -146,7 +262,17 @@ class LocalGamesProvider:
         installed = self._parser.parse()
         self._update_game_statuses(set(self._was_installed), set(installed), LocalGameState.Installed)
         self._ps_watcher.watched_games = installed
+        self._ps_watcher.launch_executables = self._get_launch_executables()
         self._was_installed = installed
+        registry.gauge('installed_games').set(len(installed))
+
+    @staticmethod
+    def _get_launch_executables():
+        try:
+            return get_launch_executables(parse_manifests())
+        except (OSError, ValueError) as e:
+            log.warning(f'Parsing game manifests has failed: {repr(e)}')
+            return {}
 
     def get_installed_paths(self):
         return self._parser.parse()
@@ -154,23 +280,28 @@ class LocalGamesProvider:
     async def parse_all_procs_if_needed(self):
         if local_client._is_installed is True:
             if len(self._was_installed) > 0 and len(self._was_running) == 0:
-                await self._ps_watcher._search_in_all_slowly(interval=0.015)
+                await self._ps_watcher._search_in_all_slowly(budget=0.002)
 
-    def check_for_running(self, check_for_new=False):
+    def check_for_running(self, check_for_new=False, exited=None):
+        """:param exited  id of a game which process exit is confirmed, its stop is reported without waiting"""
         running = self._ps_watcher.get_running_games(check_under_launcher=check_for_new)
-        self._update_game_statuses(self._was_running, running, LocalGameState.Running)
+        self._update_game_statuses(self._was_running, running, LocalGameState.Running, immediate=exited)
         self._was_running = running
 
-    def _update_game_statuses(self, previous, current, status):
+    def _on_process_exit(self, app_id):
+        if not self._first_run and app_id in self._was_running:
+            self.check_for_running(exited=app_id)
+            if app_id not in self._was_running and self.on_games_updated:
+                self.on_games_updated()
+
+    def _update_game_statuses(self, previous, current, status, immediate=None):
         for id_ in (current - previous):
             self._games[id_] |= status
-            if not self._first_run:
-                self._updated_games.add(id_)
+            self._mark_updated(id_)
 
         for id_ in (previous - current):
             self._games[id_] ^= status
-            if not self._first_run:
-                self._updated_games.add(id_)
+            self._mark_updated(id_, immediate=id_ == immediate)
 
 
 class ClientNotInstalled(Exception):
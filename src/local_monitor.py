@@ -0,0 +1,246 @@
+"""Optional sidecar running LocalGamesProvider and ProcessWatcher in a separate worker process.
+
+The worker writes one compact JSON line per second to stdout:
+    {"g": {game_id: state, ...}, "c": is_client_running, "p": process_state}
+where "g" holds only games which state changed (all games in the first line) and "p" is present only
+when tracked processes changed. The plugin writes commands to worker stdin, one JSON object per line:
+    {"launch": game_id, "timeout": seconds} or {"restore": process_state}
+A launch command is answered, once the game process is found or the search times out, with a separate line:
+    {"l": game_id, "f": found}
+Missing lines for `SidecarLocalGamesProvider.HANG_TIMEOUT` seconds mean the worker hangs and it is restarted.
+"""
+import asyncio
+import os
+import sys
+import logging as log
+from collections import defaultdict
+
+from galaxy.api.types import LocalGameState
+
+from local import LocalGamesProvider
+import json_codec
+
+LOCAL_MONITOR_ENV = 'EPIC_LOCAL_MONITOR_SIDECAR'
+
+
+def is_sidecar_enabled():
+    return os.environ.get(LOCAL_MONITOR_ENV, '') not in ('', '0')
+
+
+class SidecarLocalGamesProvider:
+    """Plugin side counterpart of LocalGamesProvider; state comes from the worker process,
+    so the plugin loop never runs psutil or disk I/O itself
+    """
+    HANG_TIMEOUT = 10
+    RESTART_DELAY = 1
+
+    def __init__(self):
+        self._games = defaultdict(lambda: LocalGameState.None_)
+        self._updated_games = set()
+        self._client_running = False
+        self._process_state = []
+        self._first_run = True
+        self._status_updater = None
+        self._worker = None
+        self._ready = None
+        self._launches = defaultdict(list)  # {game_id: [futures of search_process waiting for the worker answer]}
+        self.on_games_updated = None  # same as LocalGamesProvider.on_games_updated
+
+    @property
+    def is_client_running(self):
+        return self._client_running
+
+    @property
+    def first_run(self):
+        return self._first_run
+
+    @property
+    def games(self):
+        return self._games
+
+    @property
+    def process_state(self):
+        return self._process_state
+
+    @property
+    def launch_latencies(self):
+        """Measured and logged by the worker"""
+        return {}
+
+    def restore_process_state(self, state):
+        self._process_state = state
+        return 0
+
+    def is_game_running(self, game_id):
+        return LocalGameState.Running in self._games[game_id]
+
+    async def search_process(self, game_id, timeout):
+        """Waits for the worker to find the game process, as LocalGamesProvider.search_process does
+        :returns: True if the game process has been found
+        """
+        if not self._send({'launch': game_id, 'timeout': timeout}):
+            return False
+        answer = asyncio.get_event_loop().create_future()
+        self._launches[game_id].append(answer)
+        try:
+            # the worker does a final full scan after `timeout`; a hanging one is restarted after HANG_TIMEOUT
+            return await asyncio.wait_for(answer, timeout + self.HANG_TIMEOUT)
+        except asyncio.TimeoutError:
+            log.warning(f'Local state monitor worker has not answered launch of {game_id}')
+            return False
+        finally:
+            if answer in self._launches.get(game_id, ()):
+                self._launches[game_id].remove(answer)
+
+    def _answer_launches(self, game_id, found):
+        for answer in self._launches.pop(game_id, []):
+            if not answer.done():
+                answer.set_result(found)
+
+    def consume_updated_games(self):
+        tmp = self._updated_games.copy()
+        self._updated_games.clear()
+        return tmp
+
+    def setup(self):
+        log.info('Starting local state monitor worker')
+        self._ready = asyncio.Event()
+        self._status_updater = asyncio.get_event_loop().create_task(self._supervise())
+        self._first_run = False
+
+    async def wait_ready(self):
+        """Waits until the worker reports initial state of local games"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), self.HANG_TIMEOUT)
+        except asyncio.TimeoutError:
+            log.warning('Local state monitor worker has not reported local games in time')
+
+    def _apply(self, message):
+        if 'l' in message:
+            self._answer_launches(message['l'], message['f'])
+            return
+        for game_id, state in message.get('g', {}).items():
+            state = LocalGameState(state)
+            # initial state is not an update, same as for LocalGamesProvider
+            if self._ready.is_set() and self._games[game_id] != state:
+                self._updated_games.add(game_id)
+            self._games[game_id] = state
+        self._ready.set()
+        self._client_running = message.get('c', self._client_running)
+        self._process_state = message.get('p', self._process_state)
+        if message.get('i') and self._updated_games and self.on_games_updated:
+            self.on_games_updated()
+
+    def _send(self, command):
+        """:returns: False if there is no running worker to send the command to"""
+        if self._worker and self._worker.returncode is None:
+            self._worker.stdin.write(json_codec.dumpb(command) + b'\n')
+            return True
+        return False
+
+    async def _supervise(self):
+        while True:
+            try:
+                await self._run_worker()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.exception(f'Local state monitor worker failed: {repr(e)}')
+            await asyncio.sleep(self.RESTART_DELAY)
+
+    @staticmethod
+    def _worker_command():
+        return [sys.executable, os.path.abspath(__file__)]
+
+    async def _run_worker(self):
+        self._worker = await asyncio.create_subprocess_exec(
+            *self._worker_command(),
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        )
+        logs = asyncio.get_event_loop().create_task(self._forward_logs(self._worker.stderr))
+        try:
+            self._send({'restore': self._process_state})
+            while True:
+                line = await asyncio.wait_for(self._worker.stdout.readline(), self.HANG_TIMEOUT)
+                if not line:
+                    log.warning(f'Local state monitor worker exited with {await self._worker.wait()}')
+                    return
+                self._apply(json_codec.loads(line))
+        except asyncio.TimeoutError:
+            log.warning(f'Local state monitor worker hangs for {self.HANG_TIMEOUT}s, restarting')
+        finally:
+            logs.cancel()
+            # searches of the worker are gone with it
+            for game_id in list(self._launches):
+                self._answer_launches(game_id, False)
+            if self._worker.returncode is None:
+                self._worker.kill()
+                await self._worker.wait()
+
+    @staticmethod
+    async def _forward_logs(stream):
+        while True:
+            line = await stream.readline()
+            if not line:
+                return
+            log.info(f'[local monitor] {line.decode(errors="replace").rstrip()}')
+
+
+class _Worker:
+    INTERVAL = 1
+
+    def __init__(self, provider):
+        self._provider = provider
+        self._process_state = None
+
+    def _write(self, message):
+        sys.stdout.write(json_codec.dumps(message) + '\n')
+        sys.stdout.flush()
+
+    def _report(self, game_ids, immediate=False):
+        message = {
+            'g': {game_id: self._provider.games[game_id].value for game_id in game_ids},
+            'c': self._provider.is_client_running
+        }
+        if immediate:
+            message['i'] = True  # plugin reports the updates without waiting for its tick
+        process_state = self._provider.process_state
+        if process_state != self._process_state:
+            message['p'] = self._process_state = process_state
+        self._write(message)
+
+    async def _read_commands(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            # reading in executor because pipes are not supported by every event loop
+            line = await loop.run_in_executor(None, sys.stdin.readline)
+            if not line:
+                return
+            command = json_codec.loads(line)
+            if 'restore' in command:
+                self._provider.restore_process_state(command['restore'])
+            elif 'launch' in command:
+                loop.create_task(self._search_process(command['launch'], command['timeout']))
+
+    async def _search_process(self, game_id, timeout):
+        found = await self._provider.search_process(game_id, timeout)
+        self._write({'l': game_id, 'f': found})
+
+    async def run(self):
+        commands = asyncio.get_event_loop().create_task(self._read_commands())
+        self._provider.on_games_updated = lambda: self._report(self._provider.consume_updated_games(), immediate=True)
+        self._provider.setup()
+        self._report(list(self._provider.games))
+        while not commands.done():
+            await asyncio.sleep(self.INTERVAL)
+            self._report(self._provider.consume_updated_games())
+
+
+def main():
+    log.basicConfig(stream=sys.stderr, level=log.INFO, format='%(levelname)s %(message)s')
+    asyncio.get_event_loop().run_until_complete(_Worker(LocalGamesProvider()).run())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import hashlib
+import marshal
+import os
+
+LOG_PAYLOAD_LIMIT_ENV = 'EPIC_LOG_PAYLOAD_LIMIT'
+DEFAULT_PAYLOAD_LIMIT = 1024
+
+
+def _payload_limit_from_environment():
+    try:
+        return int(os.environ.get(LOG_PAYLOAD_LIMIT_ENV, DEFAULT_PAYLOAD_LIMIT))
+    except ValueError:
+        return DEFAULT_PAYLOAD_LIMIT
+
+
+payload_limit = _payload_limit_from_environment()
+
+
+def _repr_pieces(obj):
+    """Yields repr of `obj` piece by piece so that formatting can stop as soon as there is enough text"""
+    if isinstance(obj, dict):
+        yield '{'
+        for i, (key, value) in enumerate(obj.items()):
+            yield (', ' if i else '') + repr(key) + ': '
+            yield from _repr_pieces(value)
+        yield '}'
+    elif isinstance(obj, list):
+        yield '['
+        for i, item in enumerate(obj):
+            if i:
+                yield ', '
+            yield from _repr_pieces(item)
+        yield ']'
+    else:
+        yield repr(obj)
+
+
+def _digest(obj):
+    if isinstance(obj, str):
+        data = obj.encode('utf-8', 'backslashreplace')
+    else:
+        try:
+            data = marshal.dumps(obj)  # an order of magnitude faster than repr for parsed JSON
+        except ValueError:
+            data = repr(obj).encode('utf-8', 'backslashreplace')
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+class Payload:
+    """Stands for a possibly huge backend payload among logging arguments:
+        log.info('Library page %s', Payload(response))
+    Nothing is formatted unless the record is emitted and then only the first `limit` characters
+    (EPIC_LOG_PAYLOAD_LIMIT, 1024 by default) of repr; a cut one is followed by digest of the whole payload,
+    so the same payloads can still be matched across log lines.
+    """
+    __slots__ = ('obj', 'limit')
+
+    def __init__(self, obj, limit=None):
+        self.obj = obj
+        self.limit = payload_limit if limit is None else limit
+
+    def __str__(self):
+        if isinstance(self.obj, str):
+            if len(self.obj) <= self.limit:
+                return self.obj
+            return f'{self.obj[:self.limit]}... ({len(self.obj)} chars, blake2b {_digest(self.obj)})'
+        text, length = [], 0
+        for piece in _repr_pieces(self.obj):
+            text.append(piece)
+            length += len(piece)
+            if length > self.limit:
+                return f'{"".join(text)[:self.limit]}... (blake2b {_digest(self.obj)})'
+        return ''.join(text)
+
+    __repr__ = __str__
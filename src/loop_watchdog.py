@@ -0,0 +1,113 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+import logging as log
+from collections import Counter
+
+from metrics import registry, Histogram
+
+LOOP_WATCHDOG_ENV = 'EPIC_LOOP_WATCHDOG'
+LOOP_WATCHDOG_THRESHOLD_ENV = 'EPIC_LOOP_WATCHDOG_THRESHOLD'
+
+# frames of files from this directory are the plugin's own, the rest is asyncio, galaxy api and libraries
+_SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def is_watchdog_enabled():
+    return os.environ.get(LOOP_WATCHDOG_ENV, '') not in ('', '0')
+
+
+class LoopWatchdog:
+    """Measures asyncio loop lag and reports callbacks blocking the loop longer than `threshold` seconds.
+    A heartbeat task notes every time the loop wakes it up; a watchdog thread notices the heartbeat is late
+    and captures stack of the loop thread while the blocking callback still runs. The report is logged
+    once the loop is responsive again, at most once per `report_interval` for the same blocking function.
+    Enabled by setting EPIC_LOOP_WATCHDOG, EPIC_LOOP_WATCHDOG_THRESHOLD (seconds) overrides the default threshold.
+    """
+    DEFAULT_THRESHOLD = 0.1
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, report_interval=60):
+        self.threshold = threshold
+        self._interval = threshold / 4
+        self._report_interval = report_interval
+        self._loop_thread_id = None
+        self._last_beat = None
+        self._heartbeat_task = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._last_reports = {}  # {blocking function: monotonic time of its last report}
+        self._suppressed = Counter()  # {blocking function: blocks not reported since its last report}
+        self._lag = registry.histogram('event_loop_lag_seconds', Histogram.FAST_BUCKETS)
+        self._blocks = registry.histogram('event_loop_block_seconds')
+        self.blocks = 0
+
+    @classmethod
+    def from_environment(cls):
+        if not is_watchdog_enabled():
+            return None
+        try:
+            threshold = float(os.environ.get(LOOP_WATCHDOG_THRESHOLD_ENV, cls.DEFAULT_THRESHOLD))
+        except ValueError:
+            log.warning(f'Invalid {LOOP_WATCHDOG_THRESHOLD_ENV}, using {cls.DEFAULT_THRESHOLD}s')
+            threshold = cls.DEFAULT_THRESHOLD
+        return cls(threshold)
+
+    def start(self):
+        """Has to be called from the loop thread"""
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name='LoopWatchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self._interval
+            await asyncio.sleep(self._interval)
+            self._last_beat = time.monotonic()
+            self._lag.observe(max(0.0, self._last_beat - expected))
+
+    def _watch(self):
+        blocked_beat, stack = None, None
+        while not self._stop.wait(self._interval):
+            beat = self._last_beat
+            if stack is not None and beat != blocked_beat:
+                self._report(beat - blocked_beat - self._interval, stack)
+                stack = None
+            if stack is None and time.monotonic() - beat >= self.threshold:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    blocked_beat, stack = beat, traceback.extract_stack(frame)
+
+    @staticmethod
+    def _own_frames(stack):
+        """:returns: part of `stack` starting with the outermost plugin frame, or the whole one if there is none"""
+        for i, frame in enumerate(stack):
+            if frame.filename.startswith(_SOURCE_DIR):
+                return stack[i:]
+        return stack
+
+    def _report(self, duration, stack):
+        self.blocks += 1
+        self._blocks.observe(duration)
+        frames = self._own_frames(stack)
+        blocker = next((frame for frame in reversed(frames) if frame.filename.startswith(_SOURCE_DIR)), frames[-1])
+        function = f'{os.path.basename(blocker.filename)}:{blocker.name}'
+
+        now = time.monotonic()
+        if now - self._last_reports.get(function, -self._report_interval) < self._report_interval:
+            self._suppressed[function] += 1
+            return
+        self._last_reports[function] = now
+        suppressed = self._suppressed.pop(function, 0)
+        similar = f' ({suppressed} similar blocks not reported)' if suppressed else ''
+        log.warning(f'Event loop blocked for {duration:.3f}s in {function} (called from {frames[0].name}){similar}:\n'
+                    + ''.join(traceback.format_list(frames)))
@@ -0,0 +1,251 @@
+import asyncio
+import bisect
+import json
+import os
+import time
+import logging as log
+from collections import deque
+from contextlib import contextmanager
+
+METRICS_FILE_ENV = 'EPIC_METRICS_FILE'
+METRICS_INTERVAL_ENV = 'EPIC_METRICS_INTERVAL'
+
+
+class Histogram:
+    """Bucketed histogram with per-bucket (non cumulative) counts; `buckets` are upper bounds, the last bucket catches everything above"""
+    DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+    FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+    def to_dict(self):
+        bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'buckets': dict(zip(bounds, self.counts))
+        }
+
+    def __str__(self):
+        if not self.count:
+            return 'no samples'
+        buckets = ', '.join(
+            f'<={bound}: {count}' for bound, count in zip(list(self.buckets) + ['inf'], self.counts) if count
+        )
+        return f'count={self.count} mean={self.mean:.3f} min={self.min:.3f} max={self.max:.3f} [{buckets}]'
+
+
+class RollingHistogram:
+    """Keeps samples of the last `window` seconds (at most `max_samples` of them) for percentiles of recent behaviour"""
+    def __init__(self, window=600, max_samples=1000):
+        self.window = window
+        self._samples = deque(maxlen=max_samples)  # (monotonic time, value)
+
+    def observe(self, value):
+        self._samples.append((time.monotonic(), value))
+
+    def _expire(self):
+        oldest = time.monotonic() - self.window
+        while self._samples and self._samples[0][0] < oldest:
+            self._samples.popleft()
+
+    def values(self):
+        self._expire()
+        return sorted(value for _, value in self._samples)
+
+    @property
+    def count(self):
+        self._expire()
+        return len(self._samples)
+
+    def percentile(self, q):
+        values = self.values()
+        return values[int(q * (len(values) - 1))] if values else None
+
+    def to_dict(self):
+        values = self.values()
+        if not values:
+            return {'count': 0}
+        return {
+            'count': len(values),
+            'mean': sum(values) / len(values),
+            'p50': values[int(0.5 * (len(values) - 1))],
+            'p90': values[int(0.9 * (len(values) - 1))],
+            'p99': values[int(0.99 * (len(values) - 1))],
+            'max': values[-1]
+        }
+
+    def __str__(self):
+        summary = self.to_dict()
+        if not summary['count']:
+            return 'no samples'
+        return ' '.join(f'{key}={value:.3f}' if isinstance(value, float) else f'{key}={value}'
+                        for key, value in summary.items())
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def to_dict(self):
+        return {'value': self.value}
+
+
+class Gauge:
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def to_dict(self):
+        return {'value': self.value}
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, **extra):
+    labels = list(labels) + list(extra.items())
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape_label(value)}"' for key, value in labels) + '}'
+
+
+class MetricsRegistry:
+    """Counters, gauges and histograms of the whole plugin, each identified by name and optional labels:
+        registry.counter('http_errors_total', endpoint='graphql', status=429).inc()
+    Asking again for the same name and labels returns the same metric, so hot paths may keep the returned object.
+    """
+    def __init__(self):
+        self._metrics = {}  # {(name, ((label, value), ...)): metric}
+        self._kinds = {}  # {name: 'counter' | 'gauge' | 'histogram'}
+
+    def _get(self, kind, name, labels, factory):
+        key = name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+        metric = self._metrics.get(key)
+        if metric is None:
+            registered = self._kinds.setdefault(name, kind)
+            if registered != kind:
+                raise ValueError(f'{name} is already registered as a {registered}')
+            metric = self._metrics[key] = factory()
+        return metric
+
+    def counter(self, name, **labels) -> Counter:
+        return self._get('counter', name, labels, Counter)
+
+    def gauge(self, name, **labels) -> Gauge:
+        return self._get('gauge', name, labels, Gauge)
+
+    def histogram(self, name, buckets=Histogram.DEFAULT_BUCKETS, **labels) -> Histogram:
+        return self._get('histogram', name, labels, lambda: Histogram(buckets))
+
+    @contextmanager
+    def timer(self, name, buckets=Histogram.FAST_BUCKETS, **labels):
+        """Observes duration of the `with` block in seconds"""
+        histogram = self.histogram(name, buckets, **labels)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            histogram.observe(time.perf_counter() - start)
+
+    def to_dict(self):
+        snapshot = {}
+        for (name, labels), metric in sorted(self._metrics.items(), key=lambda item: item[0]):
+            snapshot.setdefault(name, []).append(dict(metric.to_dict(), labels=dict(labels)))
+        return snapshot
+
+    def to_prometheus(self):
+        """Snapshot in Prometheus text exposition format"""
+        lines = []
+        previous = None
+        for (name, labels), metric in sorted(self._metrics.items(), key=lambda item: item[0]):
+            if name != previous:
+                lines.append(f'# TYPE {name} {self._kinds[name]}')
+                previous = name
+            if isinstance(metric, Histogram):
+                cumulative = 0
+                for bound, count in zip(list(metric.buckets) + ['+Inf'], metric.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_format_labels(labels, le=bound)} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {metric.sum}')
+                lines.append(f'{name}_count{_format_labels(labels)} {metric.count}')
+            else:
+                lines.append(f'{name}{_format_labels(labels)} {metric.value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class MetricsExporter:
+    """Periodically writes snapshot of a registry to `path`: JSON when it ends with .json, otherwise Prometheus text
+    format (e.g. for node_exporter textfile collector). The file is replaced atomically so readers never see a partial one.
+    Enabled by setting EPIC_METRICS_FILE, EPIC_METRICS_INTERVAL (seconds) overrides the default interval.
+    """
+    DEFAULT_INTERVAL = 60
+
+    def __init__(self, registry, path, interval=DEFAULT_INTERVAL):
+        self._registry = registry
+        self.path = path
+        self.interval = interval
+
+    @classmethod
+    def from_environment(cls, registry):
+        path = os.environ.get(METRICS_FILE_ENV)
+        if not path:
+            return None
+        try:
+            interval = float(os.environ.get(METRICS_INTERVAL_ENV, cls.DEFAULT_INTERVAL))
+        except ValueError:
+            log.warning(f'Invalid {METRICS_INTERVAL_ENV}, using {cls.DEFAULT_INTERVAL}s')
+            interval = cls.DEFAULT_INTERVAL
+        return cls(registry, path, interval)
+
+    def write(self):
+        if self.path.endswith('.json'):
+            content = json.dumps({'time': time.time(), 'metrics': self._registry.to_dict()})
+        else:
+            content = self._registry.to_prometheus()
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(content)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.warning(f'Could not export metrics to {self.path}: {repr(e)}')
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.write()
@@ -1,12 +1,12 @@
 import asyncio
-import json
 import sys
 import logging as log
 import webbrowser
+from collections import defaultdict
 
-from galaxy.api.plugin import Plugin, create_and_run_plugin, JSONEncoder
-from galaxy.api.consts import Platform, LicenseType
-from galaxy.api.types import Authentication, Game, LicenseInfo, FriendInfo, LocalGame, NextStep, LocalGameState, GameTime, Dlc
+from galaxy.api.plugin import Plugin, create_and_run_plugin
+from galaxy.api.consts import Platform
+from galaxy.api.types import Authentication, FriendInfo, LocalGame, NextStep, LocalGameState, GameTime
 from galaxy.api.errors import (
     InvalidCredentials, BackendTimeout, BackendNotAvailable,
     BackendError, NetworkError, UnknownError, FailedParsingManifest
@@ -16,21 +16,34 @@ from backend import EpicClient
 from http_client import AuthenticatedHttpClient
 from version import __version__
 from local import LocalGamesProvider, local_client, ClientNotInstalled, parse_manifests
+from local_monitor import SidecarLocalGamesProvider, is_sidecar_enabled
 from consts import System, SYSTEM, AUTH_REDIRECT_URL, AUTH_PARAMS
-from definitions import GameInfo, EpicDlc
+from library import Library, DlcEntry
+from log_utils import Payload
+import json_codec
+from cache_format import encode_game_info, decode_game_info, is_current_game_info
+from metrics import registry, Histogram, MetricsExporter
+from loop_watchdog import LoopWatchdog
+from profiling import profiled
 
 
 class EpicPlugin(Plugin):
+    CACHE_PUSH_DELAY = 5  # seconds; changes of persistent cache made meanwhile are pushed together
+
     def __init__(self, reader, writer, token):
         super().__init__(Platform.Epic, __version__, reader, writer, token)
         self._http_client = AuthenticatedHttpClient(store_credentials_callback=self.store_credentials)
         self._epic_client = EpicClient(self._http_client)
-        self._local_provider = LocalGamesProvider()
+        self._local_provider = SidecarLocalGamesProvider() if is_sidecar_enabled() else LocalGamesProvider()
+        self._local_provider.on_games_updated = self._update_local_game_statuses
         self._local_client = local_client
-        self._owned_games = {}
-        self._game_info_cache = {}
-        self._encoder = JSONEncoder()
+        self._library = Library()
+        self._cache_push_handle = None
         self._refresh_owned_task = None
+        self._local_setup_task = None
+        self._metrics_exporter = MetricsExporter.from_environment(registry)
+        self._metrics_task = None
+        self._loop_watchdog = LoopWatchdog.from_environment()
 
     async def _do_auth(self):
         user_info = await self._epic_client.get_users_info([self._http_client.account_id])
@@ -72,32 +85,64 @@ class EpicPlugin(Plugin):
         return await self._do_auth()
 
     def handshake_complete(self):
-        self._game_info_cache = {
-            k: GameInfo(**v) for k, v
-            in json.loads(self.persistent_cache.get('game_info', '{}')).items()
-        }
+        game_info = self.persistent_cache.get('game_info')
+        if game_info:
+            try:
+                self._library.load(decode_game_info(game_info))
+            except ValueError as e:
+                log.warning(f"Could not load game info cache: {repr(e)}")
+            else:
+                if not is_current_game_info(game_info):
+                    self._store_encoded_cache('game_info', encode_game_info(self._library))
+        try:
+            self._local_provider.restore_process_state(json_codec.loads(self.persistent_cache.get('process_watcher', '[]')))
+        except ValueError as e:
+            log.warning(f"Could not restore process watcher state: {repr(e)}")
+        if self._metrics_exporter:
+            log.info(f"Exporting metrics to {self._metrics_exporter.path} every {self._metrics_exporter.interval}s")
+            self._metrics_task = asyncio.create_task(self._metrics_exporter.run())
+        if self._loop_watchdog:
+            log.info(f"Reporting event loop blocks longer than {self._loop_watchdog.threshold}s")
+            self._loop_watchdog.start()
 
     def _store_cache(self, key, obj):
-        self.persistent_cache[key] = self._encoder.encode(obj)
+        self._store_encoded_cache(key, json_codec.dumps(obj))
+
+    def _store_encoded_cache(self, key, value):
+        if self.persistent_cache.get(key) == value:
+            return
+        self.persistent_cache[key] = value
+        if self._cache_push_handle is None:
+            self._cache_push_handle = asyncio.get_event_loop().call_later(self.CACHE_PUSH_DELAY, self._flush_cache)
+
+    def _flush_cache(self):
+        """Pushes persistent cache now if any change is waiting for it"""
+        if self._cache_push_handle is None:
+            return
+        self._cache_push_handle.cancel()
+        self._cache_push_handle = None
         self.push_cache()
 
     def store_credentials(self, credentials: dict):
         """Prevents losing credentials on `push_cache`"""
-        self.persistent_cache['credentials'] = self._encoder.encode(credentials)
+        self.persistent_cache['credentials'] = json_codec.dumps(credentials)
         super().store_credentials(credentials)
 
     def _get_dlcs(self, products):
-        dlcs = []
+        """:returns: {catalog id of the main game: [DlcEntry]} and catalog ids of all DLCs"""
+        dlcs = defaultdict(list)
+        dlc_ids = set()
         for game in products['data']['Launcher']['libraryItems']['records']:
             try:
                 if 'mainGameItem' in game['catalogItem'] and game['catalogItem']['mainGameItem']:
-                    dlcs.append(EpicDlc(game['catalogItem']['mainGameItem']['id'], game['catalogItemId'], game['catalogItem']['title']))
+                    dlcs[game['catalogItem']['mainGameItem']['id']].append(DlcEntry(game['catalogItemId'], game['catalogItem']['title']))
+                    dlc_ids.add(game['catalogItemId'])
             except (TypeError, KeyError) as e:
-                log.error(f"Exception while trying to parse product {repr(e)}\nProduct {game}")
-        return dlcs
+                log.error("Exception while trying to parse product %r\nProduct %s", e, Payload(game))
+        return dlcs, dlc_ids
 
-    def _parse_owned_product(self, game, dlcs):
-        games_dlcs = []
+    def _parse_owned_product(self, game, dlcs, dlc_ids):
+        """:returns: library entry of `game` or None if it is not a game"""
         is_game = False
         is_application = False
 
@@ -110,65 +155,97 @@ class EpicPlugin(Plugin):
         if not is_game or not is_application:
             return
 
-        for dlc in dlcs:
-            if game['catalogItemId'] == dlc.parent_id:
-                games_dlcs.append(Dlc(dlc.dlc_id, dlc.dlc_title, LicenseInfo(LicenseType.SinglePurchase)))
-            if game['catalogItemId'] == dlc.dlc_id:
-                # product is a dlc, skip
-                return
+        if game['catalogItemId'] in dlc_ids:
+            # product is a dlc, skip
+            return
 
-        self._game_info_cache[game['appName']] = GameInfo(game['namespace'],  game['appName'], game['catalogItem']['title'])
-        return Game(game['appName'], game['catalogItem']['title'], games_dlcs, LicenseInfo(LicenseType.SinglePurchase))
+        return self._library.update(
+            game['appName'], game['namespace'], game['catalogItem']['title'], tuple(dlcs.get(game['catalogItemId'], ()))
+        )
 
     async def _get_owned_games(self):
+        """:returns: library entries of owned games"""
         parsed_games = []
         owned_products = await self._epic_client.get_owned_games()
-        dlcs = self._get_dlcs(owned_products)
+        dlcs, dlc_ids = self._get_dlcs(owned_products)
         product_mapping = await self._epic_client.get_productmapping()
         for product in owned_products['data']['Launcher']['libraryItems']['records']:
             try:
-                parsed_game = self._parse_owned_product(product, dlcs)
-                if parsed_game:
-                    cached_game_info = self._game_info_cache.get(parsed_game.game_id)
-                    if cached_game_info.namespace in product_mapping:
-                        parsed_games.append(parsed_game)
+                parsed_game = self._parse_owned_product(product, dlcs, dlc_ids)
+                if parsed_game and parsed_game.namespace in product_mapping:
+                    parsed_games.append(parsed_game)
             except (TypeError, KeyError) as e:
-                log.error(f"Exception while trying to parse product {repr(e)}\nProduct {product}")
-        self._store_cache('game_info', self._game_info_cache)
+                log.error("Exception while trying to parse product %r\nProduct %s", e, Payload(product))
+        if self._library.changed:
+            self._store_encoded_cache('game_info', encode_game_info(self._library))
+            self._library.changed = False
+        registry.gauge('owned_games').set(len(parsed_games))
         return parsed_games
 
+    @profiled
     async def get_owned_games(self):
-        games = await self._get_owned_games()
+        entries = await self._get_owned_games()
 
-        for game in games:
-            self._owned_games[game.game_id] = game
+        for entry in entries:
+            entry.owned = True
         self._refresh_owned_task = asyncio.create_task(self._check_for_new_games(300))
 
-        return games
+        return [entry.to_game() for entry in entries]
 
+    def _load_local_games_snapshot(self):
+        try:
+            snapshot = json_codec.loads(self.persistent_cache.get('local_games', '{}'))
+            return {game_id: LocalGameState(state) for game_id, state in snapshot.items()}
+        except (ValueError, TypeError, AttributeError) as e:
+            log.warning(f"Could not load local games snapshot: {repr(e)}")
+            return {}
+
+    def _store_local_games_snapshot(self):
+        self._store_cache('local_games', {
+            game_id: state.value for game_id, state in self._local_provider.games.items()
+        })
+
+    async def _setup_local_provider(self, last_known):
+        """Runs the real local scan after last known states were already returned to Galaxy
+        and pushes the differences as regular status updates"""
+        if self._local_provider.first_run:
+            self._local_provider.setup()
+        await self._local_provider.wait_ready()
+        current = dict(self._local_provider.games)
+        for game_id in set(last_known) | set(current):
+            state = current.get(game_id, LocalGameState.None_)
+            if state != last_known.get(game_id, LocalGameState.None_):
+                log.debug(f'Local state of {game_id} differs from snapshot, updating to {state}')
+                self.update_local_game_status(LocalGame(game_id, state))
+        self._store_local_games_snapshot()
+
+    @profiled
     async def get_local_games(self):
         if self._local_provider.first_run:
+            last_known = self._load_local_games_snapshot() if self._local_setup_task is None else {}
+            if last_known:
+                self._local_setup_task = asyncio.create_task(self._setup_local_provider(last_known))
+                return [LocalGame(app_name, state) for app_name, state in last_known.items()]
             self._local_provider.setup()
+            await self._local_provider.wait_ready()
+            self._store_local_games_snapshot()
         return [
             LocalGame(app_name, state)
             for app_name, state in self._local_provider.games.items()
         ]
 
     async def _get_store_slug(self, game_id):
-        cached_game_info = self._game_info_cache.get(game_id)
+        entry = self._library.get(game_id)
         try:
-            if cached_game_info:
-                title = cached_game_info.title
-                namespace = cached_game_info.namespace
+            if entry:
+                title = entry.title
+                namespace = entry.namespace
             else:  # extra safety fallback in case of dealing with removed game
                 assets = await self._epic_client.get_assets()
                 for asset in assets:
                     if asset.app_name == game_id:
-                        if game_id in self._owned_games:
-                            title = self._owned_games[game_id].game_title
-                        else:
-                            details = await self._epic_client.get_catalog_items_with_id(asset.namespace, asset.catalog_id)
-                            title = details.title
+                        details = await self._epic_client.get_catalog_items_with_id(asset.namespace, asset.catalog_id)
+                        title = details.title
                         namespace = asset.namespace
 
             product_store_info = await self._epic_client.get_product_store_info(title)
@@ -199,6 +276,7 @@ class EpicPlugin(Plugin):
         except KeyError:
             return False
 
+    @profiled
     async def launch_game(self, game_id):
         if self._local_provider.is_game_running(game_id):
             log.info(f'Game already running, game_id: {game_id}.')
@@ -240,6 +318,7 @@ class EpicPlugin(Plugin):
         except ClientNotInstalled:
             await self.open_epic_browser(await self._get_store_slug(game_id))
 
+    @profiled
     async def get_friends(self):
         ids = await self._epic_client.get_friends_list()
         account_ids = []
@@ -268,21 +347,27 @@ class EpicPlugin(Plugin):
             new_state = self._local_provider.games[id_]
             log.debug(f'Updating game {id_} state to {new_state}')
             self.update_local_game_status(LocalGame(id_, new_state))
+        if updated:
+            self._store_local_games_snapshot()
 
     async def _check_for_new_games(self, interval):
         await asyncio.sleep(interval)
 
         log.info("Checking for new games")
-        refreshed_owned_games = await self._get_owned_games()
-        for game in refreshed_owned_games:
-            if game.game_id not in self._owned_games:
+        with registry.timer('owned_games_refresh_seconds', buckets=Histogram.DEFAULT_BUCKETS):
+            refreshed_owned_games = await self._get_owned_games()
+        for entry in refreshed_owned_games:
+            if not entry.owned:
+                game = entry.to_game()
                 log.info(f"Found new game, {game}")
+                registry.counter('owned_games_added_total').inc()
                 self.add_game(game)
-                self._owned_games[game.game_id] = game
+                entry.owned = True
 
     async def prepare_game_times_context(self, game_ids):
         return await self._epic_client.get_playtime()
 
+    @profiled
     async def get_game_time(self, game_id, context):
         if context:
             playtime = context
@@ -317,16 +402,29 @@ class EpicPlugin(Plugin):
     async def shutdown_platform_client(self):
         await self._local_client.shutdown_platform_client()
 
+    @profiled
     def tick(self):
-        if not self._local_provider.first_run:
-            self._update_local_game_statuses()
+        with registry.timer('plugin_tick_seconds'):
+            if not self._local_provider.first_run:
+                self._update_local_game_statuses()
 
-        if self._refresh_owned_task and self._refresh_owned_task.done():
-            # Interval set to 8 minutes because that makes the request number just below galaxy's own calls
-            # and still maintains the functionality
-            self._refresh_owned_task = asyncio.create_task(self._check_for_new_games(60*8))
+            if self._refresh_owned_task and self._refresh_owned_task.done():
+                # Interval set to 8 minutes because that makes the request number just below galaxy's own calls
+                # and still maintains the functionality
+                self._refresh_owned_task = asyncio.create_task(self._check_for_new_games(60*8))
 
     async def shutdown(self):
+        for game_id, histogram in self._local_provider.launch_latencies.items():
+            log.debug(f'Launch latencies of {game_id}: {histogram.to_dict()}')
+        if self._local_setup_task:
+            self._local_setup_task.cancel()
+        if self._metrics_task:
+            self._metrics_task.cancel()
+            self._metrics_exporter.write()
+        if self._loop_watchdog:
+            self._loop_watchdog.stop()
+        self._store_cache('process_watcher', self._local_provider.process_state)
+        self._flush_cache()
         if self._local_provider._status_updater:
             self._local_provider._status_updater.cancel()
         if self._http_client:
@@ -0,0 +1,80 @@
+import time
+from collections import defaultdict
+
+import psutil
+
+# private map psutil.Process.children is built from; on Windows it is a single toolhelp snapshot while reading
+# ppid of every process (process_iter(['ppid'])) takes such a snapshot per process
+_ppid_map = getattr(psutil, '_ppid_map', None)
+
+
+class ProcessTableSnapshot:
+    """Process table state captured at most once and shared by all ProcessWatcher queries made during one tick.
+    `table_walks` and `status_reads` count process table walks and process status reads really done,
+    `table_walks_saved` and `status_reads_saved` those served from the snapshot instead.
+    """
+    def __init__(self):
+        self.created = time.time()
+        self._procs = {}  # {pid: psutil.Process}, made only for children asked for
+        self._children = None  # {ppid: [pid, ...]}
+        self._alive = {}  # {psutil.Process: bool}
+        self.table_walks = 0
+        self.table_walks_saved = 0
+        self.status_reads = 0
+        self.status_reads_saved = 0
+
+    @property
+    def age(self):
+        return time.time() - self.created
+
+    def _capture(self):
+        self._children = defaultdict(list)
+        if _ppid_map is not None:
+            ppids = _ppid_map().items()
+        else:
+            ppids = ((proc.info['pid'], proc.info['ppid']) for proc in psutil.process_iter(['pid', 'ppid']))
+        for pid, ppid in ppids:
+            if ppid is not None:
+                self._children[ppid].append(pid)
+        self.table_walks += 1
+
+    def _process(self, pid):
+        proc = self._procs.get(pid)
+        if proc is None:
+            proc = self._procs[pid] = psutil.Process(pid)
+        return proc
+
+    def children(self, proc: psutil.Process, recursive=False):
+        """Same as psutil.Process.children but the process table is walked only once per snapshot"""
+        if self._children is None:
+            self._capture()
+        else:
+            self.table_walks_saved += 1
+        found = []
+        parents = [proc.pid]
+        while parents:
+            for pid in self._children.get(parents.pop(), ()):
+                try:
+                    found.append(self._process(pid))
+                except psutil.NoSuchProcess:
+                    continue
+                if recursive:
+                    parents.append(pid)
+        return found
+
+    def is_alive(self, proc: psutil.Process):
+        """Checks if process is running and is not a zombie; the answer is kept for the snapshot lifetime"""
+        alive = self._alive.get(proc)
+        if alive is not None:
+            self.status_reads_saved += 1
+            return alive
+        try:
+            with proc.oneshot():
+                alive = proc.is_running() and proc.status() != psutil.STATUS_ZOMBIE
+        except psutil.NoSuchProcess:
+            alive = False
+        except psutil.AccessDenied:  # exists, but its status cannot be read
+            alive = True
+        self.status_reads += 1
+        self._alive[proc] = alive
+        return alive
@@ -1,10 +1,21 @@
 import asyncio
+import os
+import sys
 import psutil
 import logging as log
 import time
 from typing import Dict, Iterable
 from dataclasses import dataclass
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+
+from process_scanner import create_process_scanner
+from exit_watcher import PidfdExitWatcher
+from process_snapshot import ProcessTableSnapshot
+from metrics import Histogram, registry
+
+# kept at module level as these are updated for every launcher child on every tick
+_CHILD_CACHE_HITS = registry.counter('process_child_cache_lookups_total', result='hit')
+_CHILD_CACHE_MISSES = registry.counter('process_child_cache_lookups_total', result='miss')
 
 
 @dataclass
@@ -25,11 +36,144 @@ class WatchedApp:
         return hash(self.id)
 
 
+def _normalize_path(path):
+    return os.path.normcase(os.path.normpath(path))
+
+
+class _AppPathIndex:
+    """Finds watched app by executable path.
+    Other apps than games (e.g. launcher) are matched by substring of their identifier in the executable path.
+    Games are first looked up by exact launch executable path; as a fallback by install directory,
+    with one dict lookup per path component, skipping helpers bundled with games (crash reporters, anti-cheats).
+    """
+    _HELPERS = ('crashreport', 'easyanticheat', 'beservice', 'battleye', 'unrealcefsubprocess', 'prereqsetup')
+
+    def __init__(self, apps: Iterable[WatchedApp] = (), executables: Dict[str, str] = None):
+        self._roots = {}
+        self._executables = {}
+        self._identifiers = []
+        self._by_id = {}
+        for app in apps:
+            self._by_id[app.id] = app
+            if app.is_game:
+                self._roots[_normalize_path(app.dir)] = app
+            else:
+                self._identifiers.append(app)
+        for app_id, executable in (executables or {}).items():
+            if app_id in self._by_id:
+                self._executables[_normalize_path(executable)] = self._by_id[app_id]
+
+    def get(self, app_id):
+        return self._by_id.get(app_id)
+
+    def find(self, path):
+        for app in self._identifiers:
+            if app.dir in path:
+                return app
+        if not self._roots:
+            return None
+        path = _normalize_path(path)
+        app = self._executables.get(path)
+        if app is not None:
+            return app
+        if self._is_helper(path):
+            return None
+        while True:
+            app = self._roots.get(path)
+            if app is not None:
+                return app
+            parent = os.path.dirname(path)
+            if parent == path:
+                return None
+            path = parent
+
+    @classmethod
+    def _is_helper(cls, path):
+        name = os.path.basename(path).lower()
+        return any(helper in name for helper in cls._HELPERS)
+
+
+class _ChildProcessCache:
+    """LRU of launcher children classification keyed by (pid, create_time) so a reused pid is never
+    given a stale entry. Entries of processes which are no longer launcher children are evicted on every
+    scan of children and the oldest entries are dropped above `max_size`.
+    """
+    def __init__(self, max_size=256):
+        self._max_size = max_size
+        self._items = OrderedDict()  # {(pid, create_time): (psutil.Process, matched app id or None)}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(proc: psutil.Process):
+        return proc.pid, proc.create_time()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            _CHILD_CACHE_MISSES.inc()
+            return None
+        self.hits += 1
+        _CHILD_CACHE_HITS.inc()
+        self._items.move_to_end(key)
+        return item
+
+    def put(self, key, proc, app_id):
+        self._items[key] = (proc, app_id)
+        self._items.move_to_end(key)
+        while len(self._items) > self._max_size:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def retain(self, alive_keys):
+        for key in [key for key in self._items if key not in alive_keys]:
+            del self._items[key]
+            self.evictions += 1
+
+    def clear(self):
+        self._items.clear()
+
+    @property
+    def memory_footprint(self):
+        """Approximate size in bytes of the cache structure itself, without psutil.Process internals"""
+        return sys.getsizeof(self._items) + sum(
+            sys.getsizeof(key) + sys.getsizeof(item) + sys.getsizeof(item[0])
+            for key, item in self._items.items()
+        )
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._items),
+            'max_size': self._max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'memory_bytes': self.memory_footprint
+        }
+
+
 class _ProcessWatcher:
     """Low level methods"""
+    _SNAPSHOT_MAX_AGE = 1  # seconds; protects against stale state when nobody calls begin_tick
+    _SNAPSHOT_COUNTERS = ('table_walks', 'table_walks_saved', 'status_reads', 'status_reads_saved')
+
     def __init__(self):
         self._watched_apps = defaultdict(set)  # {WatchedApp: set([proc1, proc2, ...])}
-        self._cache = {}
+        self._path_index = _AppPathIndex()
+        self._launch_executables = {}
+        self._scanner = create_process_scanner()
+        self._exit_watcher = PidfdExitWatcher(self.__on_process_exit) if PidfdExitWatcher.is_supported() else None
+        self.on_process_exit = None  # optional callback called with app id as soon as its tracked process exits
+        self._snapshot = ProcessTableSnapshot()
+        self.snapshot_stats = dict.fromkeys(self._SNAPSHOT_COUNTERS, 0)  # counters of the last finished snapshot
+        self._cache = _ChildProcessCache()
 
     @property
     def watched_games(self):
@@ -44,65 +188,211 @@ class _ProcessWatcher:
         # add games from to_watch keeping its processes if already present
         for game_id, path in to_watch.items():
             self._watched_apps.setdefault(WatchedApp(game_id, path), set())
+        self._rebuild_path_index()
+
+    @property
+    def launch_executables(self):
+        return self._launch_executables
+
+    @launch_executables.setter
+    def launch_executables(self, executables: Dict[str, str]):
+        """:param executables   {game_id: full path of game launch executable}"""
+        self._launch_executables = executables
+        self._rebuild_path_index()
+
+    def _rebuild_path_index(self):
+        self._path_index = _AppPathIndex(self._watched_apps, self._launch_executables)
+        # already classified processes may match newly watched apps
+        self._scanner.forget()
+        self._cache.clear()
+
+    def begin_tick(self):
+        """Drops process table snapshot so queries made from now on see fresh state"""
+        stats = {name: getattr(self._snapshot, name) for name in self._SNAPSHOT_COUNTERS}
+        if any(stats.values()):
+            self.snapshot_stats = stats
+            for name, value in stats.items():
+                registry.counter(f'process_{name}_total').inc(value)
+            log.debug(f'Process table snapshot: {stats["table_walks"]} table walks and {stats["status_reads"]} '
+                      f'status reads done, {stats["table_walks_saved"]} and {stats["status_reads_saved"]} saved')
+        self._snapshot = ProcessTableSnapshot()
+
+    @property
+    def child_cache_stats(self):
+        return self._cache.stats()
+
+    @property
+    def _current_snapshot(self):
+        if self._snapshot.age > self._SNAPSHOT_MAX_AGE:
+            self.begin_tick()
+        return self._snapshot
 
     def _get_running_games(self):
         self.__remove_processes_if_dead()
         return set([game.id for game, procs in self.watched_games.items() if procs])
 
+    def get_state(self):
+        """:returns: identities of tracked processes which can be passed to `restore_state` after restart"""
+        state = []
+        for app, processes in self._watched_apps.items():
+            for proc in processes:
+                try:
+                    state.append({
+                        'id': app.id, 'dir': app.dir, 'is_game': app.is_game,
+                        'pid': proc.pid, 'create_time': proc.create_time(), 'exe': proc.exe()
+                    })
+                except (psutil.AccessDenied, psutil.NoSuchProcess):
+                    continue
+        return state
+
+    def restore_state(self, state):
+        """Tracks again processes saved by `get_state` if they still run; each is validated
+        by its create time and executable instead of scanning all processes.
+        :returns: number of restored processes
+        """
+        restored = 0
+        for entry in state:
+            try:
+                proc = psutil.Process(entry['pid'])
+                if proc.create_time() != entry['create_time'] or proc.exe() != entry['exe']:
+                    continue
+                app = WatchedApp(entry['id'], entry['dir'], entry['is_game'])
+            except (psutil.AccessDenied, psutil.NoSuchProcess, KeyError, TypeError):
+                continue
+            self._watched_apps.setdefault(app, set())
+            self.__track(app, proc)
+            restored += 1
+        if restored:
+            self._rebuild_path_index()
+        log.debug(f'Restored {restored} of {len(state)} tracked processes')
+        return restored
+
     def _is_app_tracked_and_running(self, app):
         if app in self._watched_apps:
             for proc in self._watched_apps[app]:
-                if proc.is_running:
+                if self._current_snapshot.is_alive(proc):
                     return True
         return False
 
-    def _search_in_all(self):
-        """Fat check"""
+    def _search_in_all(self, full=False):
+        """Fat check; unless `full` is set only processes spawned since the previous scan are classified"""
         log.debug(f'Performing check for all processes')
-        for proc in psutil.process_iter(ad_value=''):
-            self.__match_process(proc)
-
-    async def _search_in_all_slowly(self, interval=0.02):
-        """Fat check with async intervals; 0.02 lasts a few seconds"""
-        log.debug(f'Performing async check in all processes; interval: {interval}')
-        for proc in psutil.process_iter(ad_value=''):
-            self.__match_process(proc)
+        with registry.timer('process_scan_seconds', scan='full' if full else 'new'):
+            for handle, path in self._scanner.scan(new_only=not full):
+                self.__match_scanned(handle, path)
+
+    async def _search_in_all_slowly(self, budget=0.002, interval=0):
+        """Fat check split into slices taking at most `budget` seconds each.
+        Control goes back to the event loop for `interval` between slices and the scan resumes where it stopped,
+        so the scan lasts as long as the work it does rather than number of processes times sleep.
+        Wall clock is used as the budget measure because process_time has ~16ms resolution on Windows.
+        """
+        log.debug(f'Performing async check in all processes; budget: {budget}')
+        scan = self._scanner.scan(new_only=True)
+        start = time.perf_counter()
+        slices = 0
+        while True:
+            slices += 1
+            deadline = time.perf_counter() + budget
+            for handle, path in scan:
+                self.__match_scanned(handle, path)
+                if time.perf_counter() >= deadline:
+                    break
+            else:
+                break
             await asyncio.sleep(interval)
+        elapsed = time.perf_counter() - start
+        registry.histogram('process_scan_seconds', Histogram.FAST_BUCKETS, scan='sliced').observe(elapsed)
+        registry.counter('process_scan_slices_total').inc(slices)
+        log.debug(f'Async check done in {slices} slices, {elapsed:.3f}s')
 
     def _search_in_children(self, procs: Iterable[psutil.Process], recursive=True):
         """Cache only child processes because process_iter has its own module level cache"""
         found = False
-        for proc in procs.copy():
-            try:
-                for child in proc.children(recursive=recursive):
-                    if child in self._cache:
-                        found |= self.__match_process(self._cache[child])
-                    else:
-                        found |= self.__match_process(child)
-                        self._cache[child] = child
-            except (psutil.AccessDenied, psutil.NoSuchProcess) as e:
-                log.warn(f'Getting children of {proc} has failed: {e}')
+        alive_keys = set()
+        with registry.timer('process_children_scan_seconds'):
+            for proc in procs.copy():
+                try:
+                    for child in self._current_snapshot.children(proc, recursive=recursive):
+                        found |= self.__match_child(child, alive_keys)
+                except (psutil.AccessDenied, psutil.NoSuchProcess) as e:
+                    log.warn(f'Getting children of {proc} has failed: {e}')
+        self._cache.retain(alive_keys)
         return found
 
+    def __match_child(self, child, alive_keys):
+        try:
+            key = self._cache.key(child)
+        except (psutil.AccessDenied, psutil.NoSuchProcess):
+            return False
+        alive_keys.add(key)
+        cached = self._cache.get(key)
+        if cached is None:
+            app = self.__find_app(self.__get_exe(child))
+            self._cache.put(key, child, app.id if app else None)
+        else:
+            child, app_id = cached
+            app = self._path_index.get(app_id) if app_id else None
+        if app is None:
+            return False
+        self.__track(app, child)
+        return True
+
+    @staticmethod
+    def __get_exe(proc):
+        try:
+            return proc.exe()
+        except (psutil.AccessDenied, psutil.NoSuchProcess):
+            return ''
+
     def __match_process(self, proc):
-        for game in self._watched_apps:
-            try:
-                path = proc.exe()
-            except (psutil.AccessDenied, psutil.NoSuchProcess):
-                pass
-            else:
-                if not path:
-                    return False
-                elif game.dir in path:
-                    self._watched_apps[game].add(proc)
-                    return True
-        return False
+        app = self.__find_app(self.__get_exe(proc))
+        if app is None:
+            return False
+        self.__track(app, proc)
+        return True
+
+    def __match_scanned(self, handle, path):
+        """Like __match_process but for (handle, exe path) pairs yielded by process scanner"""
+        app = self.__find_app(path)
+        if app is None:
+            return False
+        try:
+            self.__track(app, self._scanner.process(handle))
+        except (psutil.AccessDenied, psutil.NoSuchProcess):
+            return False
+        return True
+
+    def __find_app(self, path):
+        if not path:
+            return None
+        return self._path_index.find(path)
+
+    def __track(self, app, proc):
+        processes = self._watched_apps[app]
+        if proc not in processes:
+            processes.add(proc)
+            if self._exit_watcher:
+                self._exit_watcher.watch(proc)
+
+    def __on_process_exit(self, proc):
+        for app, processes in self._watched_apps.items():
+            if proc in processes:
+                log.debug(f'Process {proc} has exited')
+                processes.remove(proc)
+                break
+        else:
+            return
+        if self.on_process_exit:
+            self.on_process_exit(app.id)
 
     def __remove_processes_if_dead(self):
         for game, processes in self._watched_apps.items():
             # work on copy to avoid adding processes during iteration
             for proc in processes.copy():
-                if not proc.is_running() or proc.status() == psutil.STATUS_ZOMBIE:
+                if self._exit_watcher and self._exit_watcher.is_watching(proc):
+                    continue  # exit will be reported without polling
+                if not self._current_snapshot.is_alive(proc):
                     log.debug(f'Process {proc} is dead')
                     self._watched_apps[game].remove(proc)
 
@@ -113,7 +403,9 @@ class ProcessWatcher(_ProcessWatcher):
     def __init__(self, launcher_identifier):
         super().__init__()
         self._watched_apps[WatchedApp(self._LAUNCHER_ID, launcher_identifier, False)]
+        self._rebuild_path_index()
         self._launcher_children_cache = set()
+        self.launch_latencies = defaultdict(Histogram)  # {game_id: launch-to-detect latency histogram}
 #        self._search_in_all()
 
     @property
@@ -136,28 +428,45 @@ class ProcessWatcher(_ProcessWatcher):
                 return True
             self._search_in_all()
             await asyncio.sleep(long_interval)
+            self.begin_tick()
         return False
 
-    async def pool_until_game_start(self, game_id, timeout, sint, lint):
+    async def pool_until_game_start(self, game_id, timeout, sint, lint, burst_interval=0.05, burst_duration=2):
         """
-        :param sint     interval between checking launcher children
+        Checks launcher children every `burst_interval` for `burst_duration` seconds after the launcher is found,
+        then doubles the interval up to `sint`.
+        :param sint     (max) interval between checking launcher children
         :param lint     (longer) interval between checking if launcher exists
         """
         log.debug(f'Starting wait for game {game_id} process')
         start = time.time()
+        burst_start = None  # a cold started launcher may take longer than the burst to show up
+        interval = burst_interval
         while time.time() - start < timeout:
-            found = await self._pool_until_launcher_start(timeout, lint)
+            found = await self._pool_until_launcher_start(timeout - (time.time() - start), lint)
             if found:
+                if burst_start is None:
+                    burst_start = time.time()
                 self._search_in_children(self._launcher)
                 if self._watched_apps[game_id]:
-                    log.debug(f'Game process found in {time.time() - start}s')
+                    self._record_launch_latency(game_id, time.time() - start)
                     return True
-                await asyncio.sleep(sint)
+                await asyncio.sleep(interval)
+                self.begin_tick()
+                if time.time() - burst_start >= burst_duration:
+                    interval = min(interval * 2, sint)
 
-        self._search_in_all()
+        self._search_in_all(full=True)
         if self._watched_apps[game_id]:
             log.debug(f'Game process found in the final fallback parsing all processes')
+            self._record_launch_latency(game_id, time.time() - start)
             return True
+        log.info(f'Game {game_id} process not found {timeout}s after launch')
+
+    def _record_launch_latency(self, game_id, latency):
+        histogram = self.launch_latencies[game_id]
+        histogram.observe(latency)
+        log.info(f'Game {game_id} process found {latency:.3f}s after launch; launch latencies: {histogram}')
 
     def get_running_games(self, check_under_launcher):
         """Return set of ids of currently running games.
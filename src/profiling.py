@@ -0,0 +1,124 @@
+import asyncio
+import cProfile
+import functools
+import os
+import time
+import tracemalloc
+import logging as log
+
+PROFILE_DIR_ENV = 'EPIC_PROFILE_DIR'
+PROFILE_KEEP_ENV = 'EPIC_PROFILE_KEEP'
+PROFILE_MIN_DURATION_ENV = 'EPIC_PROFILE_MIN_DURATION'
+PROFILE_MEMORY_ENV = 'EPIC_PROFILE_MEMORY'
+
+
+class Profiler:
+    """Profiles calls of wrapped functions with cProfile and, if `memory` is set, tracemalloc.
+    Every call lasting at least `min_duration` seconds leaves `<time>-<pid>-<seq>-<function>.pstats`
+    (load with pstats.Stats) and `.tracemalloc` (tracemalloc.Snapshot.load) in `directory`;
+    only files of the last `keep` calls are kept.
+    Calls made while another one is profiled are part of the outer profile. Profile of a coroutine
+    covers everything the loop runs until it returns, as that is what delays it as well.
+    """
+    DEFAULT_KEEP = 100
+    DEFAULT_MIN_DURATION = 0.05
+    _TRACEBACK_LIMIT = 25
+
+    def __init__(self, directory, keep=DEFAULT_KEEP, min_duration=DEFAULT_MIN_DURATION, memory=True):
+        self.directory = directory
+        self.keep = keep
+        self.min_duration = min_duration
+        self.memory = memory
+        self._profile = None
+        self._seq = 0
+
+    @classmethod
+    def from_environment(cls):
+        directory = os.environ.get(PROFILE_DIR_ENV)
+        if not directory:
+            return None
+        try:
+            keep = int(os.environ.get(PROFILE_KEEP_ENV, cls.DEFAULT_KEEP))
+            min_duration = float(os.environ.get(PROFILE_MIN_DURATION_ENV, cls.DEFAULT_MIN_DURATION))
+        except ValueError:
+            log.warning(f'Invalid {PROFILE_KEEP_ENV} or {PROFILE_MIN_DURATION_ENV}, using defaults')
+            keep, min_duration = cls.DEFAULT_KEEP, cls.DEFAULT_MIN_DURATION
+        memory = os.environ.get(PROFILE_MEMORY_ENV, '1') not in ('', '0')
+        return cls(directory, keep, min_duration, memory)
+
+    def wrap(self, func):
+        name = func.__name__
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if self._profile is not None:
+                    return await func(*args, **kwargs)
+                start = self._begin()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self._end(name, start)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if self._profile is not None:
+                    return func(*args, **kwargs)
+                start = self._begin()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self._end(name, start)
+        return wrapper
+
+    def _begin(self):
+        if self.memory:
+            if hasattr(tracemalloc, 'reset_peak'):
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start(self._TRACEBACK_LIMIT)
+                tracemalloc.reset_peak()
+            else:
+                # no reset_peak before Python 3.9, restarting tracing resets the peak (and traces) for this call
+                tracemalloc.stop()
+                tracemalloc.start(self._TRACEBACK_LIMIT)
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        return time.perf_counter()
+
+    def _end(self, name, start):
+        profile, self._profile = self._profile, None
+        profile.disable()
+        duration = time.perf_counter() - start
+        if duration < self.min_duration:
+            return
+        self._seq += 1
+        path = os.path.join(self.directory, f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{self._seq:06d}-{name}')
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            profile.dump_stats(path + '.pstats')
+            if self.memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.take_snapshot().dump(path + '.tracemalloc')
+                log.debug(f'Profiled {name}: {duration:.3f}s, peak traced memory {peak / 2 ** 20:.1f}MB')
+            self._rotate()
+        except OSError as e:
+            log.warning(f'Could not save profile of {name} to {self.directory}: {repr(e)}')
+
+    def _rotate(self):
+        calls = sorted({os.path.splitext(file)[0] for file in os.listdir(self.directory)
+                        if file.endswith(('.pstats', '.tracemalloc'))})
+        for call in calls[:-self.keep]:
+            for extension in ('.pstats', '.tracemalloc'):
+                try:
+                    os.remove(os.path.join(self.directory, call + extension))
+                except FileNotFoundError:
+                    pass
+
+
+profiler = Profiler.from_environment()
+
+
+def profiled(func):
+    """Profiles calls of `func` when EPIC_PROFILE_DIR is set at import time, otherwise returns it untouched"""
+    if profiler is None:
+        return func
+    return profiler.wrap(func)
@@ -2,6 +2,7 @@ from unittest.mock import MagicMock, PropertyMock
 import pytest
 
 from utils import AsyncMock
+from fake_backend import FakeEpicBackend, FakeBackendConfig
 import platform
 from plugin import EpicPlugin
 from process_watcher import ProcessWatcher
@@ -67,6 +68,8 @@ def process_watcher():
 def local_provider(process_watcher, mocker):
     mocker.patch("local.ProcessWatcher", return_value=process_watcher)
     mock = MagicMock()
+    mock.process_state = []
+    mock.launch_latencies = {}
     return mock
 
 
@@ -97,3 +100,18 @@ async def authenticated_plugin(plugin, http_client, backend_client, mocker, acco
     mocker.patch.object(plugin, "store_credentials")
     await plugin.authenticate({"refresh_token": "TOKEN"})
     return plugin
+
+
+@pytest.fixture
+async def start_fake_backend():
+    backends = []
+
+    async def start(**config):
+        backend = FakeEpicBackend(FakeBackendConfig(**config))
+        await backend.start()
+        backends.append(backend)
+        return backend
+
+    yield start
+    for backend in backends:
+        await backend.stop()
@@ -0,0 +1,377 @@
+"""Local stand-in for the Epic backend services used by EpicClient and AuthenticatedHttpClient.
+
+Serves OAuth, account, launcher assets, catalog, friends, store content product mapping, Epic ID (exchange code)
+and GraphQL (library, playtime, store search) endpoints under a single base URL, so the plugin can be pointed at it
+with EPIC_BACKEND_URL (see consts.backend_url) and end-to-end tests run offline.
+
+Synthetic mode generates responses for a library of `library_size` items. Latency, server errors, 429s and expiring
+access tokens (401s) can be injected. Record mode proxies requests to the real services and saves responses to
+a fixtures file; replay mode serves responses from such a file instead of synthetic ones.
+Recorded fixtures contain real tokens and account data, do not commit them.
+
+Usage: python tests/fake_backend.py [--port 8080] [--library-size 1000] [--latency 0.05] [--error-rate 0.01]
+                                    [--rate-limit-rate 0.01] [--token-lifetime 100] [--record FILE | --replay FILE]
+       EPIC_BACKEND_URL=http://localhost:8080 python src/plugin.py ...
+"""
+import argparse
+import asyncio
+import dataclasses
+import hashlib
+import json
+import logging as log
+import random
+import re
+from collections import Counter
+from typing import Optional
+
+import aiohttp
+from aiohttp import web
+
+# real services proxied in record mode, by path prefix
+UPSTREAMS = (
+    ('/account/', 'https://account-public-service-prod03.ol.epicgames.com'),
+    ('/launcher/', 'https://launcher-public-service-prod06.ol.epicgames.com'),
+    ('/catalog/', 'https://catalog-public-service-prod06.ol.epicgames.com'),
+    ('/friends/', 'https://friends-public-service-prod06.ol.epicgames.com'),
+    ('/graphql', 'https://graphql.epicgames.com'),
+    ('/api/content/', 'https://store-content.ak.epicgames.com'),
+    ('/id/', 'https://www.epicgames.com'),
+)
+_PROXIED_HEADERS = ('Authorization', 'User-Agent', 'Content-Type', 'Cookie', 'Referer', 'X-XSRF-TOKEN')
+
+
+@dataclasses.dataclass
+class FakeBackendConfig:
+    account_id: str = 'c531da7e3abf4ba2a6760799f5b6180c'
+    display_name: str = 'testerg62'
+    library_size: int = 100
+    page_size: int = 100  # records per GraphQL library page
+    dlc_every: int = 10  # every n-th library item is a DLC of the previous game, 0 disables DLCs
+    friends: int = 10
+    latency: float = 0.0  # seconds added to every response
+    jitter: float = 0.0  # uniformly random extra latency, up to `jitter` seconds
+    error_rate: float = 0.0  # fraction of requests answered with `error_status`
+    error_status: int = 500
+    rate_limit_rate: float = 0.0  # fraction of requests answered with 429
+    token_lifetime: Optional[int] = None  # number of requests an access token is accepted for
+    reject_refresh_token: bool = False
+    seed: int = 0
+    record: Optional[str] = None  # fixtures file to record responses of real services to
+    replay: Optional[str] = None  # fixtures file to serve responses from
+
+
+def _catalog_id(i):
+    return hashlib.md5(f'item{i}'.encode()).hexdigest()
+
+
+class FakeEpicBackend:
+    def __init__(self, config=None):
+        self.config = config or FakeBackendConfig()
+        self.url = None
+        self.requests = Counter()  # {endpoint: count}
+        self.faults = Counter()  # {status: count}
+        self._random = random.Random(self.config.seed)
+        self._tokens = {}  # {access token: requests left or None}
+        self._issued = 0
+        self._library = self._generate_library()
+        self._fixtures = {}
+        if self.config.replay:
+            with open(self.config.replay) as f:
+                self._fixtures = json.load(f)
+        self._upstream_session = None
+        self._runner = None
+
+        self._app = web.Application(middlewares=[self._middleware])
+        self._app.router.add_post('/account/api/oauth/token', self._oauth_token, name='oauth')
+        self._app.router.add_get('/account/api/public/account', self._account, name='account')
+        self._app.router.add_get('/launcher/api/public/assets/{platform}', self._assets, name='assets')
+        self._app.router.add_get('/catalog/api/shared/namespace/{namespace}/bulk/items', self._catalog, name='catalog')
+        self._app.router.add_get('/friends/api/public/friends/{account_id}', self._friends, name='friends')
+        self._app.router.add_get('/api/content/productmapping', self._productmapping, name='productmapping')
+        self._app.router.add_post('/graphql', self._graphql, name='graphql')
+        self._app.router.add_get('/id/api/authenticate', self._id_authenticate, name='id_authenticate')
+        self._app.router.add_get('/id/api/csrf', self._id_csrf, name='id_csrf')
+        self._app.router.add_post('/id/api/exchange/generate', self._id_exchange, name='id_exchange')
+
+    async def start(self, host='127.0.0.1', port=0):
+        if self.config.record:
+            self._upstream_session = aiohttp.ClientSession()
+        self._runner = web.AppRunner(self._app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        port = self._runner.addresses[0][1]
+        # aiohttp client does not keep cookies of IP address hosts and the exchange code flow relies on them
+        self.url = f'http://{"localhost" if host == "127.0.0.1" else host}:{port}'
+        return self.url
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+        if self._upstream_session:
+            await self._upstream_session.close()
+            self._upstream_session = None
+            with open(self.config.record, 'w') as f:
+                json.dump(self._fixtures, f, indent=1, sort_keys=True)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def _generate_library(self):
+        library = []
+        for i in range(self.config.library_size):
+            dlc = self.config.dlc_every and i % self.config.dlc_every == self.config.dlc_every - 1 and i > 0
+            parent = library[-1] if dlc else None
+            library.append({
+                'catalogItemId': _catalog_id(i),
+                'namespace': parent['namespace'] if dlc else f'ns{i}',
+                'appName': f'App{i}',
+                'catalogItem': {
+                    'id': _catalog_id(i),
+                    'namespace': parent['namespace'] if dlc else f'ns{i}',
+                    'title': f'Dlc {i}' if dlc else f'Game {i}',
+                    'categories': [{'path': 'addons'}] if dlc else [{'path': 'games'}, {'path': 'applications'}],
+                    'releaseInfo': [{'platform': ['Windows', 'Mac']}],
+                    'dlcItemList': None,
+                    'mainGameItem': {'id': parent['catalogItemId']} if dlc else None,
+                    'customAttributes': [{'key': 'CanRunOffline', 'value': 'true'}]
+                }
+            })
+        return library
+
+    @staticmethod
+    def _fixture_key(request, body):
+        key = f'{request.method} {request.path}'
+        if request.query_string:
+            key += '?' + '&'.join(sorted(request.query_string.split('&')))
+        if request.path == '/graphql':
+            query = json.loads(body or b'{}')
+            match = re.search(r'query\s+(\w+)', query.get('query', ''))
+            key += f' {match.group(1) if match else ""} {json.dumps(query.get("variables"), sort_keys=True)}'
+        return key
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        route = request.match_info.route.name or request.path
+        self.requests[route] += 1
+        if self.config.record:
+            return await self._proxy(request)
+
+        delay = self.config.latency + self._random.uniform(0, self.config.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        roll = self._random.random()
+        if roll < self.config.rate_limit_rate:
+            self.faults[429] += 1
+            return web.json_response({'errorCode': 'errors.com.epicgames.common.throttled'}, status=429,
+                                     headers={'Retry-After': '1'})
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            self.faults[self.config.error_status] += 1
+            return web.json_response({'errorCode': 'errors.com.epicgames.common.server_error'},
+                                     status=self.config.error_status)
+
+        if self.config.replay:
+            return await self._replay(request)
+        if route not in ('oauth', 'productmapping') and not route.startswith('id_') and not self._authorized(request):
+            self.faults[401] += 1
+            if route == 'graphql':  # GraphQL reports errors in response body
+                return web.json_response({'errors': [{'message': '{"errorStatus":401}'}], 'data': None})
+            return web.json_response({'errorCode': 'errors.com.epicgames.common.authentication.token_verification_failed'},
+                                     status=401)
+        return await handler(request)
+
+    def _authorized(self, request):
+        token = request.headers.get('Authorization', '').partition(' ')[2]
+        if token not in self._tokens:
+            return False
+        left = self._tokens[token]
+        if left is not None:
+            if left <= 0:
+                return False
+            self._tokens[token] = left - 1
+        return True
+
+    async def _replay(self, request):
+        key = self._fixture_key(request, await request.read())
+        fixture = self._fixtures.get(key)
+        if fixture is None:
+            log.warning(f'No recorded response for {key}')
+            return web.json_response({'errorCode': 'fake_backend.fixture_not_found', 'key': key}, status=404)
+        return self._fixture_response(fixture)
+
+    async def _proxy(self, request):
+        upstream = next((url for prefix, url in UPSTREAMS if request.path.startswith(prefix)), None)
+        if upstream is None:
+            return web.json_response({'errorCode': 'fake_backend.unknown_upstream'}, status=404)
+        body = await request.read()
+        headers = {name: request.headers[name] for name in _PROXIED_HEADERS if name in request.headers}
+        async with self._upstream_session.request(
+            request.method, upstream + request.path_qs, data=body or None, headers=headers
+        ) as upstream_response:
+            fixture = {
+                'status': upstream_response.status,
+                'content_type': upstream_response.content_type,
+                'body': await upstream_response.text(),
+                'cookies': {name: morsel.value for name, morsel in upstream_response.cookies.items()}
+            }
+        self._fixtures[self._fixture_key(request, body)] = fixture
+        return self._fixture_response(fixture)
+
+    @staticmethod
+    def _fixture_response(fixture):
+        response = web.Response(status=fixture['status'], text=fixture['body'], content_type=fixture['content_type'])
+        for name, value in fixture.get('cookies', {}).items():
+            response.set_cookie(name, value)
+        return response
+
+    def _issue_tokens(self):
+        self._issued += 1
+        access_token = f'access-{self._issued}'
+        self._tokens[access_token] = self.config.token_lifetime
+        return {
+            'access_token': access_token,
+            'refresh_token': f'refresh-{self._issued}',
+            'account_id': self.config.account_id,
+            'expires_in': 28800,
+            'token_type': 'bearer'
+        }
+
+    async def _oauth_token(self, request):
+        data = await request.post()
+        grant_type = data.get('grant_type')
+        if grant_type not in ('refresh_token', 'exchange_code') or not data.get(grant_type) \
+                or (grant_type == 'refresh_token' and self.config.reject_refresh_token):
+            self.faults[400] += 1
+            return web.json_response({'errorCode': 'errors.com.epicgames.account.auth_token.invalid_refresh_token'},
+                                     status=400)
+        return web.json_response(self._issue_tokens())
+
+    async def _account(self, request):
+        return web.json_response([
+            {
+                'id': account_id,
+                'displayName': self.config.display_name if account_id == self.config.account_id else f'friend-{account_id}',
+                'externalAuths': {}
+            }
+            for account_id in request.query.getall('accountId', [])
+        ])
+
+    async def _assets(self, request):
+        return web.json_response([
+            {
+                'appName': item['appName'],
+                'labelName': 'Live',
+                'buildVersion': '1.0.0',
+                'catalogItemId': item['catalogItemId'],
+                'namespace': item['namespace']
+            }
+            for item in self._library
+        ])
+
+    async def _catalog(self, request):
+        items = {}
+        for catalog_id in request.query.getall('id', []):
+            for item in self._library:
+                if item['catalogItemId'] == catalog_id:
+                    items[catalog_id] = item['catalogItem']
+        return web.json_response(items)
+
+    async def _friends(self, request):
+        return web.json_response([
+            {'accountId': f'{i:032x}', 'status': 'ACCEPTED', 'direction': 'OUTBOUND', 'favorite': False}
+            for i in range(self.config.friends)
+        ])
+
+    async def _productmapping(self, request):
+        return web.json_response({
+            item['namespace']: item['catalogItem']['title'].lower().replace(' ', '-')
+            for item in self._library if not item['catalogItem']['mainGameItem']
+        })
+
+    async def _graphql(self, request):
+        query = await request.json()
+        match = re.search(r'query\s+(\w+)', query.get('query', ''))
+        operation = match.group(1) if match else None
+        variables = query.get('variables') or {}
+        if operation == 'libraryQuery':
+            start = int(variables.get('cursor') or 0)
+            end = start + self.config.page_size
+            return web.json_response({'data': {'Launcher': {'libraryItems': {
+                'records': self._library[start:end],
+                'responseMetadata': {'nextCursor': str(end) if end < len(self._library) else None}
+            }}}})
+        if operation == 'playtimeTrackingQuery':
+            return web.json_response({'data': {'PlaytimeTracking': {'total': [
+                {'artifactId': item['appName'], 'totalTime': 60 * i}
+                for i, item in enumerate(self._library) if not item['catalogItem']['mainGameItem']
+            ]}}})
+        if operation == 'searchQuery':
+            keywords = variables.get('query', '').lower()
+            return web.json_response({'data': {'Catalog': {'catalogOffers': {'elements': [
+                {
+                    'title': item['catalogItem']['title'],
+                    'productSlug': item['catalogItem']['title'].lower().replace(' ', '-'),
+                    'linkedOfferNs': item['namespace'],
+                    'categories': item['catalogItem']['categories']
+                }
+                for item in self._library if keywords and item['catalogItem']['title'].lower() == keywords
+            ]}}}})
+        return web.json_response({'errors': [{'message': f'Unknown operation {operation}'}], 'data': None})
+
+    async def _id_authenticate(self, request):
+        return web.json_response({'account_id': self.config.account_id})
+
+    async def _id_csrf(self, request):
+        response = web.Response(status=204)
+        response.set_cookie('XSRF-TOKEN', 'fake-xsrf-token')
+        return response
+
+    async def _id_exchange(self, request):
+        if request.headers.get('X-XSRF-TOKEN') != 'fake-xsrf-token':
+            self.faults[403] += 1
+            return web.json_response({'errorCode': 'errors.com.epicgames.accountportal.csrf_token_invalid'}, status=403)
+        return web.json_response({'code': f'exchange-{self._issued}'})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--library-size', type=int, default=1000)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--dlc-every', type=int, default=10)
+    parser.add_argument('--friends', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=500)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--token-lifetime', type=int)
+    parser.add_argument('--reject-refresh-token', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--record', metavar='FILE', help='proxy to real services and save responses to FILE')
+    group.add_argument('--replay', metavar='FILE', help='serve responses recorded to FILE')
+    args = vars(parser.parse_args())
+    host, port = args.pop('host'), args.pop('port')
+
+    log.basicConfig(level=log.INFO)
+    loop = asyncio.get_event_loop()
+    backend = FakeEpicBackend(FakeBackendConfig(**args))
+    url = loop.run_until_complete(backend.start(host, port))
+    print(f'Fake Epic backend listening, run the plugin with EPIC_BACKEND_URL={url}')
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(backend.stop())
+        print(f'Requests: {dict(backend.requests)}, injected faults: {dict(backend.faults)}')
+
+
+if __name__ == '__main__':
+    main()
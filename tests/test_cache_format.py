@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from cache_format import encode_game_info, decode_game_info, is_current_game_info
+from library import LibraryEntry
+
+
+def test_round_trip():
+    game_infos = [('fn', 'Fortnite', 'Fortnite'), ('fn', 'FortniteDLC', 'Fortnite: Save the World'), ('min', 'Min', 'Hades')]
+
+    value = encode_game_info(LibraryEntry(app_name, namespace, title) for namespace, app_name, title in game_infos)
+
+    assert is_current_game_info(value)
+    assert decode_game_info(value) == game_infos
+    assert decode_game_info(encode_game_info([])) == []
+
+
+def test_legacy_format():
+    value = json.dumps({'Min': {'namespace': 'min', 'app_name': 'Min', 'title': 'Hades'}})
+
+    assert not is_current_game_info(value)
+    assert decode_game_info(value) == [('min', 'Min', 'Hades')]
+
+
+def test_smaller_than_legacy_format():
+    entries = [LibraryEntry(f'App{i}', f'ns{i // 3}', f'Game {i}') for i in range(1000)]
+    legacy = json.dumps({
+        entry.app_name: {'namespace': entry.namespace, 'app_name': entry.app_name, 'title': entry.title}
+        for entry in entries
+    })
+
+    assert len(encode_game_info(entries)) < len(legacy) / 3
+
+
+@pytest.mark.parametrize('value', [
+    '3:whatever',
+    '2:not base64!',
+    '2:' + 'eJwDAAAAAAE=',  # compressed empty string
+    '{"Min": {"namespace": "min"}}',
+])
+def test_malformed(value):
+    with pytest.raises(ValueError):
+        decode_game_info(value)
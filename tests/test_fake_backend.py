@@ -0,0 +1,150 @@
+import json
+from unittest.mock import MagicMock
+
+import aiohttp
+import pytest
+from galaxy.api.errors import TooManyRequests
+
+from backend import EpicClient
+from http_client import AuthenticatedHttpClient
+
+
+@pytest.fixture
+def point_to(mocker):
+    def point(backend):
+        for name in ('ACCOUNT_SERVICE_URL', 'LAUNCHER_SERVICE_URL', 'CATALOG_SERVICE_URL', 'FRIENDS_SERVICE_URL',
+                     'GRAPHQL_SERVICE_URL', 'STORE_CONTENT_URL'):
+            mocker.patch(f'backend.{name}', backend.url)
+        mocker.patch('http_client.EPIC_ID_SERVICE_URL', backend.url)
+        mocker.patch.object(AuthenticatedHttpClient, '_OAUTH_URL', backend.url + '/account/api/oauth/token')
+    return point
+
+
+@pytest.fixture
+async def http_client():
+    client = AuthenticatedHttpClient(store_credentials_callback=MagicMock())
+    yield client
+    await client.close()
+
+
+@pytest.fixture
+async def session():
+    async with aiohttp.ClientSession() as session:
+        yield session
+
+
+async def test_owned_games_pages(start_fake_backend, point_to, http_client, refresh_token):
+    backend = await start_fake_backend(library_size=250, page_size=100)
+    point_to(backend)
+    await http_client.authenticate_with_refresh_token(refresh_token)
+
+    response = await EpicClient(http_client).get_owned_games()
+
+    assert len(response['data']['Launcher']['libraryItems']['records']) == 250
+    assert backend.requests['graphql'] == 3
+
+
+async def test_expired_token_is_refreshed(start_fake_backend, point_to, http_client, refresh_token):
+    backend = await start_fake_backend(library_size=10, token_lifetime=1)
+    point_to(backend)
+    await http_client.authenticate_with_refresh_token(refresh_token)
+    client = EpicClient(http_client)
+
+    await client.get_playtime()
+    await client.get_friends_list()
+
+    assert backend.faults[401] == 1
+    assert backend.requests['oauth'] == 2
+
+
+async def test_exchange_code_flow(start_fake_backend, point_to, http_client, account_id):
+    backend = await start_fake_backend()
+    point_to(backend)
+
+    await http_client.authenticate_with_exchange_code(await http_client.retrieve_exchange_code())
+
+    assert http_client.authenticated
+    assert http_client.account_id == account_id
+
+
+async def test_rate_limited(start_fake_backend, point_to, http_client, refresh_token):
+    backend = await start_fake_backend()
+    point_to(backend)
+    await http_client.authenticate_with_refresh_token(refresh_token)
+    backend.config.rate_limit_rate = 1
+
+    with pytest.raises(TooManyRequests):
+        await EpicClient(http_client).get_productmapping()
+
+
+async def test_library_pages(start_fake_backend, session):
+    backend = await start_fake_backend(library_size=25, page_size=10, dlc_every=5)
+    query = {'query': 'query libraryQuery($cursor: String) {}', 'variables': {'cursor': '20'}}
+    token = (await (await session.post(backend.url + '/account/api/oauth/token', data={
+        'grant_type': 'refresh_token', 'refresh_token': 'TOKEN'
+    })).json())['access_token']
+
+    response = await session.post(backend.url + '/graphql', json=query, headers={'Authorization': 'bearer ' + token})
+    library_items = (await response.json())['data']['Launcher']['libraryItems']
+
+    assert [record['appName'] for record in library_items['records']] == ['App20', 'App21', 'App22', 'App23', 'App24']
+    assert library_items['records'][4]['catalogItem']['mainGameItem'] == {'id': library_items['records'][3]['catalogItemId']}
+    assert library_items['responseMetadata']['nextCursor'] is None
+
+
+async def test_unauthorized(start_fake_backend, session):
+    backend = await start_fake_backend()
+
+    response = await session.get(backend.url + '/launcher/api/public/assets/Windows')
+    graph_response = await session.post(backend.url + '/graphql', json={'query': 'query libraryQuery {}'})
+
+    assert response.status == 401
+    assert '401' in (await graph_response.json())['errors'][0]['message']
+
+
+@pytest.mark.parametrize('config,status', [
+    ({'error_rate': 1}, 500),
+    ({'error_rate': 1, 'error_status': 503}, 503),
+    ({'rate_limit_rate': 1}, 429),
+])
+async def test_injected_faults(start_fake_backend, session, config, status):
+    backend = await start_fake_backend(**config)
+
+    response = await session.get(backend.url + '/api/content/productmapping')
+
+    assert response.status == status
+    assert backend.faults == {status: 1}
+
+
+async def test_record_and_replay(start_fake_backend, session, mocker, tmpdir):
+    fixtures = str(tmpdir.join('fixtures.json'))
+    upstream = await start_fake_backend(library_size=3, dlc_every=0)
+    mocker.patch('fake_backend.UPSTREAMS', (('/', upstream.url),))
+    recorder = await start_fake_backend(record=fixtures)
+    recorded = await (await session.get(recorder.url + '/api/content/productmapping')).json()
+    await recorder.stop()
+
+    replayer = await start_fake_backend(replay=fixtures)
+    replayed = await session.get(replayer.url + '/api/content/productmapping')
+    missing = await session.get(replayer.url + '/launcher/api/public/assets/Windows')
+
+    assert recorded == {'ns0': 'game-0', 'ns1': 'game-1', 'ns2': 'game-2'}
+    assert await replayed.json() == recorded
+    assert missing.status == 404
+    with open(fixtures) as f:
+        assert list(json.load(f)) == ['GET /api/content/productmapping']
+
+
+async def test_http_client_traces_endpoints(start_fake_backend, point_to, http_client, refresh_token):
+    backend = await start_fake_backend(library_size=10, token_lifetime=1)
+    point_to(backend)
+    await http_client.authenticate_with_refresh_token(refresh_token)
+    client = EpicClient(http_client)
+
+    await client.get_owned_games()
+    await client.get_owned_games()  # rejected, refreshed and retried
+
+    endpoints = http_client.tracer.endpoints
+    assert endpoints['oauth'].total.count == 2
+    assert endpoints['graphql:libraryQuery'].total.count == 2
+    assert endpoints['graphql:libraryQuery#retry'].total.count == 1
@@ -1,3 +1,4 @@
+import json
 from unittest.mock import MagicMock
 
 import pytest
@@ -38,12 +39,12 @@ def user_agent():
 def oauth_response(access_token, refresh_token, account_id):
     response = MagicMock()
     response.status = 200
-    response.json = AsyncMock()
-    response.json.return_value = {
+    response.read = AsyncMock()
+    response.read.return_value = json.dumps({
         "access_token": access_token,
         "refresh_token": refresh_token,
         "account_id": account_id
-    }
+    }).encode()
     return response
 
 
@@ -0,0 +1,75 @@
+import aiohttp
+import pytest
+
+from http_tracing import HttpTracer, endpoint_name, retrying
+
+
+@pytest.fixture
+async def tracer_session():
+    tracer = HttpTracer()
+    async with aiohttp.ClientSession(trace_configs=[tracer.trace_config], raise_for_status=True) as session:
+        yield tracer, session
+
+
+@pytest.mark.parametrize('url,name', [
+    ('https://account-public-service-prod03.ol.epicgames.com/account/api/oauth/token', 'oauth'),
+    ('https://account-public-service-prod03.ol.epicgames.com/account/api/public/account?&accountId=1', 'account'),
+    ('https://launcher-public-service-prod06.ol.epicgames.com/launcher/api/public/assets/Windows', 'assets'),
+    ('https://catalog-public-service-prod06.ol.epicgames.com/catalog/api/shared/namespace/fn/bulk/items', 'catalog'),
+    ('https://store-content.ak.epicgames.com/api/content/productmapping', 'productmapping'),
+    ('https://graphql.epicgames.com/graphql', 'graphql'),
+    ('https://www.epicgames.com/id/api/csrf', 'id'),
+    ('https://example.com/', 'other'),
+])
+def test_endpoint_name(url, name):
+    assert endpoint_name(url) == name
+
+
+async def test_graphql_operation(start_fake_backend, tracer_session):
+    tracer, session = tracer_session
+    backend = await start_fake_backend()
+
+    response = await session.post(backend.url + '/graphql', json={'query': '\n query libraryQuery($cursor: String) {}'})
+    body = await response.read()
+
+    stats = tracer.endpoints['graphql:libraryQuery']
+    assert stats.ttfb.count == 1
+    assert stats.total.count == 1
+    assert stats.body_size.values() == [len(body)]
+    assert stats.total.percentile(0.5) >= stats.ttfb.percentile(0.5)
+
+
+async def test_connection_reused(start_fake_backend, tracer_session):
+    tracer, session = tracer_session
+    backend = await start_fake_backend()
+
+    for _ in range(3):
+        await (await session.get(backend.url + '/api/content/productmapping')).read()
+
+    stats = tracer.endpoints['productmapping']
+    assert stats.connect.count == 1
+    assert stats.total.count == 3
+
+
+async def test_retry(start_fake_backend, tracer_session):
+    tracer, session = tracer_session
+    backend = await start_fake_backend()
+
+    await (await session.get(backend.url + '/api/content/productmapping')).read()
+    with retrying():
+        await (await session.get(backend.url + '/api/content/productmapping')).read()
+
+    assert tracer.endpoints['productmapping'].total.count == 1
+    assert tracer.endpoints['productmapping#retry'].total.count == 1
+
+
+async def test_errors(start_fake_backend, tracer_session):
+    tracer, session = tracer_session
+    backend = await start_fake_backend(rate_limit_rate=1)
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        await session.get(backend.url + '/api/content/productmapping')
+
+    stats = tracer.endpoints['productmapping']
+    assert stats.errors == {429: 1}
+    assert stats.total.count == 0
@@ -0,0 +1,71 @@
+import dataclasses
+from enum import Enum
+from typing import Optional
+from unittest.mock import MagicMock
+
+import pytest
+from galaxy.unittest.mock import AsyncMock
+
+import json_codec
+from json_codec import CODECS, read_json
+
+
+class Color(Enum):
+    Red = "red"
+
+
+@dataclasses.dataclass
+class Item:
+    name: str
+    color: Color
+    note: Optional[str] = None
+
+
+@pytest.fixture(params=list(CODECS))
+def codec(request):
+    return CODECS[request.param]
+
+
+def test_round_trip(codec):
+    obj = {"title": "Ünreal Tournament", "ids": [1, 2.5, None, True], "nested": {"a": []}}
+    assert codec.loads(codec.dumpb(obj)) == obj
+    assert codec.loads(codec.dumps(obj)) == obj
+    assert codec.dumps(obj) == '{"title":"Ünreal Tournament","ids":[1,2.5,null,true],"nested":{"a":[]}}'
+    assert codec.dumpb(obj) == codec.dumps(obj).encode()
+
+
+def test_loads_bom(codec):
+    assert codec.loads(b'\xef\xbb\xbf{"InstallationList":[]}') == {"InstallationList": []}
+
+
+def test_loads_malformed(codec):
+    with pytest.raises(ValueError):
+        codec.loads(b'{"InstallationList":')
+
+
+def test_dataclass_and_enum(codec):
+    assert codec.loads(codec.dumps([Item("hat", Color.Red)])) == [{"name": "hat", "color": "red"}]
+    assert codec.loads(codec.dumps(Item("hat", Color.Red, "blue"))) == {"name": "hat", "color": "red", "note": "blue"}
+
+
+def test_not_serializable(codec):
+    with pytest.raises(TypeError):
+        codec.dumps({"value": object()})
+
+
+def test_unknown_codec_falls_back(monkeypatch):
+    monkeypatch.setenv(json_codec.JSON_CODEC_ENV, "simdjson")
+    assert json_codec._codec_from_environment() in CODECS.values()
+    monkeypatch.setenv(json_codec.JSON_CODEC_ENV, "json")
+    assert json_codec._codec_from_environment() is json_codec.StdlibCodec
+
+
+@pytest.mark.parametrize("body, expected", [
+    (b'{"elements":[{"id":"1"}]}', {"elements": [{"id": "1"}]}),
+    (b'', None),
+    (b' \r\n', None),
+])
+async def test_read_json(body, expected):
+    response = MagicMock()
+    response.read = AsyncMock(return_value=body)
+    assert await read_json(response) == expected
@@ -0,0 +1,44 @@
+import sys
+
+from galaxy.api.consts import LicenseType
+from galaxy.api.types import Game, Dlc, LicenseInfo
+
+from library import Library, LibraryEntry, DlcEntry
+
+
+def test_update():
+    library = Library()
+    library.load([('fn', 'Fortnite', 'Fortnite')])
+    assert not library.changed
+
+    entry = library.update('Fortnite', 'fn', 'Fortnite', (DlcEntry('dlc1', 'Save the World'),))
+    assert not library.changed
+    assert library.get('Fortnite') is entry
+
+    library.update('Fortnite', 'fn', 'Fortnite Battle Royale')
+    assert library.changed
+    assert entry.title == 'Fortnite Battle Royale'
+    assert entry.dlcs == ()
+
+    library.changed = False
+    library.update('Min', 'min', 'Hades')
+    assert library.changed
+    assert [entry.app_name for entry in library] == ['Fortnite', 'Min']
+
+
+def test_strings_are_interned():
+    library = Library()
+    first = library.update(''.join(['For', 'tnite']), ''.join(['f', 'n']), 'Fortnite')
+    second = library.update('FortniteDLC', ''.join(['f', 'n']), 'Fortnite DLC')
+
+    assert first.namespace is second.namespace
+    assert first.app_name is sys.intern('Fortnite')
+
+
+def test_to_game():
+    entry = LibraryEntry('Fortnite', 'fn', 'Fortnite', (DlcEntry('dlc1', 'Save the World'),))
+
+    assert entry.to_game() == Game(
+        'Fortnite', 'Fortnite', [Dlc('dlc1', 'Save the World', LicenseInfo(LicenseType.SinglePurchase))],
+        LicenseInfo(LicenseType.SinglePurchase)
+    )
@@ -0,0 +1,136 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+from galaxy.unittest.mock import AsyncMock
+from galaxy.api.types import LocalGame, LocalGameState
+
+from local import LocalGamesProvider
+
+
+@pytest.fixture
+def local_games_provider(local_provider):
+    def setup():
+        local_provider.first_run = False
+        local_provider.games = {
+            "Min": LocalGameState.Installed,
+            "Dill": LocalGameState.Installed | LocalGameState.Running
+        }
+    local_provider.first_run = True
+    local_provider.games = {}
+    local_provider.setup = MagicMock(side_effect=setup)
+    local_provider.wait_ready = AsyncMock()
+    return local_provider
+
+
+@pytest.mark.asyncio
+async def test_local_games_without_snapshot(plugin, local_games_provider):
+    plugin.push_cache = MagicMock()
+    local_games = await plugin.get_local_games()
+
+    local_games_provider.setup.assert_called_once_with()
+    assert local_games == [
+        LocalGame("Min", LocalGameState.Installed),
+        LocalGame("Dill", LocalGameState.Installed | LocalGameState.Running)
+    ]
+    assert json.loads(plugin.persistent_cache['local_games']) == {"Min": 1, "Dill": 3}
+
+
+@pytest.mark.asyncio
+async def test_local_games_from_snapshot(plugin, local_games_provider):
+    plugin.push_cache = MagicMock()
+    plugin.update_local_game_status = MagicMock()
+    plugin.persistent_cache['local_games'] = json.dumps({"Min": 1, "Fn": 1})
+
+    local_games = await plugin.get_local_games()
+
+    local_games_provider.setup.assert_not_called()
+    assert local_games == [
+        LocalGame("Min", LocalGameState.Installed),
+        LocalGame("Fn", LocalGameState.Installed)
+    ]
+
+    await plugin._local_setup_task
+    local_games_provider.setup.assert_called_once_with()
+    assert sorted(plugin.update_local_game_status.call_args_list, key=lambda c: c[0][0].game_id) == [
+        ((LocalGame("Dill", LocalGameState.Installed | LocalGameState.Running),),),
+        ((LocalGame("Fn", LocalGameState.None_),),)
+    ]
+    assert json.loads(plugin.persistent_cache['local_games']) == {"Min": 1, "Dill": 3}
+
+
+@pytest.fixture
+def provider(mocker):
+    mocker.patch("local.asyncio.get_event_loop")
+    mocker.patch("local.LauncherInstalledParser")
+    provider = LocalGamesProvider(notification_window=1.0)
+    provider._ps_watcher = MagicMock()
+    provider._ps_watcher.get_running_games.return_value = set()
+    provider._parser.file_has_changed.return_value = True
+    provider._parser.parse.return_value = {"Min": "C:\\Games\\Minit"}
+    provider.setup()
+    return provider
+
+
+def test_status_changes_wait_for_window(provider, mocker):
+    time = mocker.patch("local.time.time", return_value=100)
+    provider._ps_watcher.get_running_games.return_value = {"Min"}
+    provider.check_for_running()
+    assert provider.consume_updated_games() == set()
+
+    time.return_value = 101
+    assert provider.consume_updated_games() == {"Min"}
+    assert provider.games["Min"] == LocalGameState.Installed | LocalGameState.Running
+    assert provider.consume_updated_games() == set()
+
+
+def test_flapping_status_is_coalesced(provider, mocker):
+    time = mocker.patch("local.time.time", return_value=100)
+    for running in [{"Min"}, set(), {"Min"}, set()]:
+        provider._ps_watcher.get_running_games.return_value = running
+        provider.check_for_running()
+
+    time.return_value = 101
+    assert provider.consume_updated_games() == set()
+    assert provider.suppressed_updates == 4
+
+    provider._ps_watcher.get_running_games.return_value = {"Min"}
+    provider.check_for_running()
+    provider._ps_watcher.get_running_games.return_value = set()
+    provider.check_for_running()
+    provider._ps_watcher.get_running_games.return_value = {"Min"}
+    provider.check_for_running()
+
+    time.return_value = 102
+    assert provider.consume_updated_games() == {"Min"}
+    assert provider.suppressed_updates == 6
+
+
+def test_changing_status_is_reported_within_max_wait(provider, mocker):
+    time = mocker.patch("local.time.time")
+    for tick in range(11):
+        time.return_value = 100 + tick / 2
+        provider._ps_watcher.get_running_games.return_value = {"Min"} if tick % 2 == 0 else set()
+        provider.check_for_running()
+        if tick < 10:
+            assert provider.consume_updated_games() == set()
+
+    assert provider.consume_updated_games() == {"Min"}
+    assert provider.games["Min"] == LocalGameState.Installed | LocalGameState.Running
+    assert provider.suppressed_updates == 10
+
+
+def test_confirmed_exit_is_reported_at_once(provider, mocker):
+    time = mocker.patch("local.time.time", return_value=100)
+    provider._ps_watcher.get_running_games.return_value = {"Min"}
+    provider.check_for_running()
+    time.return_value = 101
+    assert provider.consume_updated_games() == {"Min"}
+    provider.on_games_updated = MagicMock()
+
+    provider._ps_watcher.get_running_games.return_value = set()
+    provider._on_process_exit("Min")
+
+    provider.on_games_updated.assert_called_once_with()
+    assert provider.consume_updated_games() == {"Min"}
+    assert provider.games["Min"] == LocalGameState.Installed
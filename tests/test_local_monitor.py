@@ -0,0 +1,101 @@
+import asyncio
+import json
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+from galaxy.api.types import LocalGameState
+from galaxy.unittest.mock import AsyncMock
+
+from local_monitor import SidecarLocalGamesProvider, _Worker
+
+
+@pytest.fixture
+async def sidecar(mocker):
+    mocker.patch.object(SidecarLocalGamesProvider, "_supervise", new_callable=AsyncMock)
+    sidecar = SidecarLocalGamesProvider()
+    sidecar.setup()
+    return sidecar
+
+
+@pytest.mark.asyncio
+async def test_initial_state_is_not_an_update(sidecar):
+    sidecar._apply({"g": {"Min": 1, "Dill": 3}, "c": True})
+    await sidecar.wait_ready()
+    assert sidecar.games == {"Min": LocalGameState.Installed, "Dill": LocalGameState.Installed | LocalGameState.Running}
+    assert sidecar.is_client_running
+    assert sidecar.is_game_running("Dill")
+    assert sidecar.consume_updated_games() == set()
+
+    # restarted worker reports full state again
+    sidecar._apply({"g": {"Min": 3, "Dill": 3}, "c": True, "p": [{"pid": 1}]})
+    assert sidecar.consume_updated_games() == {"Min"}
+    assert sidecar.process_state == [{"pid": 1}]
+
+
+@pytest.mark.asyncio
+async def test_immediate_update_is_passed_on(sidecar):
+    sidecar.on_games_updated = MagicMock()
+    sidecar._apply({"g": {"Min": 3}, "c": True})
+    sidecar._apply({"g": {"Min": 1}, "c": True})
+    sidecar.on_games_updated.assert_not_called()
+
+    sidecar._apply({"g": {"Min": 3}, "c": True, "i": True})
+    sidecar.on_games_updated.assert_called_once_with()
+    assert sidecar.consume_updated_games() == {"Min"}
+
+
+@pytest.mark.asyncio
+async def test_search_process_waits_for_worker_answer(sidecar):
+    sidecar._worker = MagicMock(returncode=None)
+    search = asyncio.ensure_future(sidecar.search_process("Min", timeout=30))
+    await asyncio.sleep(0)
+    assert not search.done()
+    assert json.loads(sidecar._worker.stdin.write.call_args[0][0]) == {"launch": "Min", "timeout": 30}
+
+    sidecar._apply({"l": "Min", "f": True})
+    assert await search is True
+    assert sidecar.games == {}
+
+
+@pytest.mark.asyncio
+async def test_search_process_without_answer(sidecar):
+    assert await sidecar.search_process("Min", timeout=30) is False
+
+    sidecar._worker = MagicMock(returncode=None)
+    sidecar.HANG_TIMEOUT = 0
+    assert await sidecar.search_process("Min", timeout=0.01) is False
+
+
+@pytest.mark.asyncio
+async def test_worker_answers_launch(capsys):
+    provider = MagicMock()
+    provider.search_process = AsyncMock(return_value=False)
+    await _Worker(provider)._search_process("Min", 30)
+    provider.search_process.assert_called_once_with("Min", 30)
+    assert json.loads(capsys.readouterr().out) == {"l": "Min", "f": False}
+
+
+@pytest.mark.asyncio
+async def test_hanging_worker_is_killed(mocker):
+    sidecar = SidecarLocalGamesProvider()
+    sidecar.HANG_TIMEOUT = 0.2
+    mocker.patch.object(sidecar, "_worker_command", return_value=[sys.executable, "-c", "import time; time.sleep(30)"])
+    await sidecar._run_worker()
+    assert sidecar._worker.returncode is not None
+
+
+def test_worker_reports_changes(capsys):
+    provider = MagicMock()
+    provider.games = {"Min": LocalGameState.Installed, "Dill": LocalGameState.Installed | LocalGameState.Running}
+    provider.is_client_running = False
+    provider.process_state = []
+    worker = _Worker(provider)
+
+    worker._report(["Min", "Dill"])
+    worker._report(["Dill"])
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"g": {"Min": 1, "Dill": 3}, "c": False, "p": []},
+        {"g": {"Dill": 3}, "c": False}
+    ]
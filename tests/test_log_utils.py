@@ -0,0 +1,39 @@
+import logging
+
+import pytest
+
+from log_utils import Payload
+
+
+@pytest.mark.parametrize('obj', [
+    {'records': [{'appName': 'Fortnite', 'categories': None}], 'cursor': 1.5},
+    [],
+    'short text',
+    ValueError('error'),
+])
+def test_short_payload_is_not_cut(obj):
+    assert str(Payload(obj, limit=100)) == (obj if isinstance(obj, str) else repr(obj))
+
+
+def test_long_payload_is_cut_with_digest():
+    records = [{'appName': f'App{i}'} for i in range(1000)]
+    other_records = records[:-1] + [{'appName': 'Other'}]
+
+    text = str(Payload(records, limit=50))
+    other_text = str(Payload(other_records, limit=50))
+
+    assert text.startswith(repr(records)[:50] + '... (blake2b ')
+    assert text[:50] == other_text[:50]
+    assert text != other_text
+    assert str(Payload('x' * 100, limit=10)).startswith('x' * 10 + '... (100 chars, blake2b ')
+
+
+def test_payload_is_formatted_only_when_emitted(caplog, mocker):
+    repr_pieces = mocker.patch('log_utils._repr_pieces', side_effect=lambda obj: iter(['{}']))
+    caplog.set_level(logging.WARNING)
+
+    logging.info('Library page %s', Payload({}))
+    assert not repr_pieces.called
+
+    logging.warning('Library page %s', Payload({}))
+    assert caplog.records[-1].getMessage() == 'Library page {}'
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+import os
+import time
+
+import pytest
+
+from loop_watchdog import LoopWatchdog
+
+
+def parse_everything(duration):
+    time.sleep(duration)
+
+
+@pytest.fixture
+async def watchdog(mocker):
+    mocker.patch('loop_watchdog._SOURCE_DIR', os.path.dirname(__file__))
+    watchdog = LoopWatchdog(threshold=0.05)
+    watchdog.start()
+    yield watchdog
+    watchdog.stop()
+
+
+async def test_responsive_loop_is_not_reported(watchdog, caplog):
+    for _ in range(10):
+        await asyncio.sleep(0.01)
+
+    assert watchdog.blocks == 0
+    assert not [record for record in caplog.records if record.levelno >= logging.WARNING]
+
+
+async def test_blocking_call_is_reported(watchdog, caplog):
+    parse_everything(0.2)
+    await asyncio.sleep(0.1)
+
+    assert watchdog.blocks == 1
+    report = caplog.records[-1]
+    assert report.levelno == logging.WARNING
+    assert 'in test_loop_watchdog.py:parse_everything (called from test_blocking_call_is_reported)' in report.message
+    assert 'time.sleep(duration)' in report.message
+
+
+async def test_reports_are_rate_limited(watchdog, caplog):
+    for _ in range(3):
+        parse_everything(0.1)
+        await asyncio.sleep(0.1)
+
+    assert watchdog.blocks == 3
+    assert len([record for record in caplog.records if record.levelno == logging.WARNING]) == 1
+
+
+def test_from_environment(monkeypatch):
+    assert LoopWatchdog.from_environment() is None
+    monkeypatch.setenv('EPIC_LOOP_WATCHDOG', '1')
+    assert LoopWatchdog.from_environment().threshold == LoopWatchdog.DEFAULT_THRESHOLD
+    monkeypatch.setenv('EPIC_LOOP_WATCHDOG_THRESHOLD', '0.5')
+    assert LoopWatchdog.from_environment().threshold == 0.5
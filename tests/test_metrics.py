@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from metrics import Histogram, RollingHistogram, MetricsRegistry, MetricsExporter
+
+
+def test_histogram():
+    histogram = Histogram(buckets=(0.1, 1))
+    for value in [0.05, 0.1, 0.5, 3]:
+        histogram.observe(value)
+    assert histogram.to_dict() == {
+        'count': 4,
+        'sum': 3.65,
+        'min': 0.05,
+        'max': 3,
+        'buckets': {'0.1': 2, '1': 1, '+Inf': 1}
+    }
+    assert str(Histogram()) == 'no samples'
+
+
+def test_rolling_histogram(mocker):
+    now = mocker.patch('metrics.time.monotonic', return_value=0)
+    histogram = RollingHistogram(window=10, max_samples=4)
+    for value in [5, 1, 4, 2, 3]:
+        histogram.observe(value)
+    assert histogram.values() == [1, 2, 3, 4]
+    assert histogram.to_dict() == {'count': 4, 'mean': 2.5, 'p50': 2, 'p90': 3, 'p99': 3, 'max': 4}
+
+    now.return_value = 5
+    histogram.observe(10)
+    now.return_value = 12
+    assert histogram.values() == [10]
+    assert histogram.percentile(0.5) == 10
+    now.return_value = 20
+    assert histogram.count == 0
+    assert str(histogram) == 'no samples'
+
+
+def test_registry():
+    registry = MetricsRegistry()
+    registry.counter('requests_total', endpoint='graphql').inc()
+    registry.counter('requests_total', endpoint='graphql').inc(2)
+    registry.counter('requests_total', endpoint='oauth').inc()
+    registry.gauge('owned_games').set(10)
+    with registry.timer('tick_seconds', buckets=(1,)):
+        pass
+
+    assert registry.counter('requests_total', endpoint='graphql').value == 3
+    with pytest.raises(ValueError):
+        registry.gauge('requests_total')
+    assert registry.to_prometheus() == (
+        '# TYPE owned_games gauge\n'
+        'owned_games 10\n'
+        '# TYPE requests_total counter\n'
+        'requests_total{endpoint="graphql"} 3\n'
+        'requests_total{endpoint="oauth"} 1\n'
+        '# TYPE tick_seconds histogram\n'
+        'tick_seconds_bucket{le="1"} 1\n'
+        'tick_seconds_bucket{le="+Inf"} 1\n'
+        f'tick_seconds_sum {registry.histogram("tick_seconds").sum}\n'
+        'tick_seconds_count 1\n'
+    )
+
+
+@pytest.mark.parametrize('name', ['metrics.prom', 'metrics.json'])
+def test_exporter_write(tmpdir, name):
+    registry = MetricsRegistry()
+    registry.counter('errors_total', status=429).inc()
+    path = str(tmpdir.join(name))
+
+    MetricsExporter(registry, path).write()
+
+    with open(path) as f:
+        content = f.read()
+    if name.endswith('.json'):
+        assert json.loads(content)['metrics'] == {'errors_total': [{'value': 1, 'labels': {'status': '429'}}]}
+    else:
+        assert content == '# TYPE errors_total counter\nerrors_total{status="429"} 1\n'
+    assert tmpdir.listdir() == [tmpdir.join(name)]
+
+
+def test_exporter_from_environment(monkeypatch):
+    assert MetricsExporter.from_environment(MetricsRegistry()) is None
+    monkeypatch.setenv('EPIC_METRICS_FILE', 'metrics.prom')
+    monkeypatch.setenv('EPIC_METRICS_INTERVAL', '5')
+
+    exporter = MetricsExporter.from_environment(MetricsRegistry())
+
+    assert (exporter.path, exporter.interval) == ('metrics.prom', 5)
@@ -3,10 +3,11 @@ from unittest.mock import Mock
 
 from galaxy.api.errors import AuthenticationRequired, UnknownBackendResponse
 from galaxy.api.consts import LicenseType
-from galaxy.api.types import Game, LicenseInfo
+from galaxy.api.types import Game, LicenseInfo, Dlc
 
 from backend import EpicClient
 from definitions import Asset, CatalogItem
+from cache_format import decode_game_info, is_current_game_info
 import json
 
 @pytest.fixture
@@ -226,3 +227,75 @@ async def test_add_game(authenticated_plugin, backend_client):
     await authenticated_plugin._check_for_new_games(0)
     authenticated_plugin.add_game.assert_called_with(bought_game)
 
+
+
+FORTNITE_LIBRARY = {'data': {'Launcher': {'libraryItems': {'records': [{
+    'catalogItemId': '4fe75bbc5a674f4f9b356b5c90567da5',
+    'namespace': 'fn',
+    'appName': 'Fortnite',
+    'catalogItem': {
+        'id': '4fe75bbc5a674f4f9b356b5c90567da5',
+        'namespace': 'fn',
+        'title': 'Fortnite',
+        'categories': [{'path': 'games'}, {'path': 'applications'}],
+        'releaseInfo': [{'platform': ['Windows', 'Mac']}],
+        'dlcItemList': None,
+        'mainGameItem': None
+    }
+}]}}}}
+
+
+@pytest.mark.asyncio
+async def test_dlcs(authenticated_plugin, backend_client):
+    dlc = {
+        'catalogItemId': 'c6d0ad6d6bbf4bd3a3cbd1e3a04c0d3b',
+        'namespace': 'fn',
+        'appName': 'FortniteDLC',
+        'catalogItem': {
+            'id': 'c6d0ad6d6bbf4bd3a3cbd1e3a04c0d3b',
+            'namespace': 'fn',
+            'title': 'Save the World',
+            'categories': [{'path': 'games'}, {'path': 'applications'}],
+            'mainGameItem': {'id': '4fe75bbc5a674f4f9b356b5c90567da5'}
+        }
+    }
+    library = json.loads(json.dumps(FORTNITE_LIBRARY))
+    library['data']['Launcher']['libraryItems']['records'].append(dlc)
+    backend_client.get_owned_games.return_value = library
+
+    games = await authenticated_plugin.get_owned_games()
+
+    assert games == [Game("Fortnite", "Fortnite", [
+        Dlc('c6d0ad6d6bbf4bd3a3cbd1e3a04c0d3b', 'Save the World', LicenseInfo(LicenseType.SinglePurchase, None))
+    ], LicenseInfo(LicenseType.SinglePurchase, None))]
+
+
+@pytest.mark.asyncio
+async def test_game_info_cache_push_is_debounced(authenticated_plugin, backend_client):
+    authenticated_plugin.push_cache = Mock()
+    backend_client.get_owned_games.return_value = FORTNITE_LIBRARY
+
+    await authenticated_plugin.get_owned_games()
+    stored = authenticated_plugin.persistent_cache['game_info']
+    await authenticated_plugin.get_owned_games()
+
+    assert authenticated_plugin.persistent_cache['game_info'] is stored
+    assert decode_game_info(stored) == [('fn', 'Fortnite', 'Fortnite')]
+    authenticated_plugin.push_cache.assert_not_called()
+    authenticated_plugin._flush_cache()
+    authenticated_plugin.push_cache.assert_called_once_with()
+
+
+@pytest.mark.asyncio
+async def test_game_info_cache_migration(plugin):
+    plugin.push_cache = Mock()
+    plugin.persistent_cache['game_info'] = json.dumps(
+        {'Fortnite': {'namespace': 'fn', 'app_name': 'Fortnite', 'title': 'Fortnite'}}
+    )
+
+    plugin.handshake_complete()
+
+    entry = plugin._library.get('Fortnite')
+    assert (entry.namespace, entry.title, entry.owned) == ('fn', 'Fortnite', False)
+    assert is_current_game_info(plugin.persistent_cache['game_info'])
+    assert decode_game_info(plugin.persistent_cache['game_info']) == [('fn', 'Fortnite', 'Fortnite')]
@@ -1,6 +1,10 @@
+import json
+import os
+
 import pytest
 
-from local import LauncherInstalledParser
+import json_codec
+from local import LauncherInstalledParser, get_launch_executables
 
 
 @pytest.fixture
@@ -23,3 +27,61 @@ def test_launcher_installed_parser(load_file):
     parser = LauncherInstalledParser()
     parser._load_file = load_file
     assert parser.parse() == {'Dill': 'C:\\Program Files\\Epic Games\\Transistor'}
+
+
+@pytest.fixture
+def launcher_installed(tmp_path):
+    path = tmp_path / "LauncherInstalled.dat"
+    path.write_text(json.dumps({"InstallationList": [{"InstallLocation": "C:\\Games\\Minit", "AppName": "Min"}]}))
+    return path
+
+
+@pytest.fixture
+def parser(launcher_installed):
+    parser = LauncherInstalledParser()
+    parser._path = str(launcher_installed)
+    return parser
+
+
+def test_parse_is_cached(parser, mocker):
+    assert parser.parse() == {"Min": "C:\\Games\\Minit"}
+    load = mocker.spy(json_codec, "loads")
+    assert parser.parse() == {"Min": "C:\\Games\\Minit"}
+    load.assert_not_called()
+
+
+def test_mtime_touch_is_not_a_change(parser, launcher_installed):
+    assert parser.file_has_changed()
+    os.utime(launcher_installed, (0, 0))
+    assert not parser.file_has_changed()
+    assert parser.parse() == {"Min": "C:\\Games\\Minit"}
+
+
+def test_content_change(parser, launcher_installed):
+    assert parser.file_has_changed()
+    launcher_installed.write_text(json.dumps({"InstallationList": []}))
+    os.utime(launcher_installed, (0, 0))
+    assert parser.parse() == {}
+    assert parser.file_has_changed()
+    assert not parser.file_has_changed()
+
+
+def test_get_launch_executables():
+    manifests = {
+        "Min": {"AppName": "Min", "InstallLocation": "C:\\Games\\Minit", "LaunchExecutable": "Minit.exe"},
+        "Dill": {"AppName": "Dill", "InstallLocation": "C:\\Games\\Transistor", "LaunchExecutable": ""},
+        "Abu": {"AppName": "Abu"}
+    }
+    assert get_launch_executables(manifests) == {"Min": os.path.join("C:\\Games\\Minit", "Minit.exe")}
+
+
+def test_deleted_file(parser, launcher_installed):
+    assert parser.file_has_changed()
+    launcher_installed.unlink()
+    assert parser.file_has_changed()
+    assert parser.parse() == {}
+    assert not parser.file_has_changed()
+
+    launcher_installed.write_text(json.dumps({"InstallationList": [{"InstallLocation": "C:\\Games\\Minit", "AppName": "Min"}]}))
+    assert parser.file_has_changed()
+    assert parser.parse() == {"Min": "C:\\Games\\Minit"}
@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+
+import psutil
+import pytest
+
+from process_scanner import ProcfsProcessScanner, PsutilProcessScanner, create_process_scanner
+
+linux_only = pytest.mark.skipif(not ProcfsProcessScanner.is_supported(), reason="requires /proc")
+
+
+def test_psutil_scanner_finds_itself():
+    scanned = {handle.pid: exe for handle, exe in PsutilProcessScanner().scan()}
+    assert scanned[os.getpid()] == psutil.Process().exe()
+
+
+@linux_only
+def test_procfs_scanner_finds_itself():
+    scanner = ProcfsProcessScanner()
+    scanned = dict(scanner.scan())
+    assert scanned[os.getpid()] == os.path.realpath(sys.executable)
+    assert scanner.process(os.getpid()) == psutil.Process()
+
+
+@linux_only
+def test_procfs_scanner_cache_is_keyed_by_start_time(mocker):
+    scanner = ProcfsProcessScanner()
+    list(scanner.scan())
+    read_exe = mocker.spy(scanner, "_read_exe")
+    list(scanner.scan())
+    assert mocker.call(os.getpid()) not in read_exe.call_args_list
+
+    # pid reused by another process
+    start_time = scanner._read_start_time(os.getpid())
+    mocker.patch.object(
+        scanner, "_read_start_time",
+        side_effect=lambda pid: start_time + 1 if pid == os.getpid() else ProcfsProcessScanner._read_start_time(scanner, pid)
+    )
+    list(scanner.scan())
+    read_exe.assert_any_call(os.getpid())
+
+
+@pytest.mark.parametrize("scanner", [
+    PsutilProcessScanner,
+    pytest.param(ProcfsProcessScanner, marks=linux_only)
+])
+def test_scan_new_only(scanner):
+    def scanned_pids(scanner):
+        return [scanner.process(handle).pid for handle, _ in scanner.scan(new_only=True)]
+
+    scanner = scanner()
+    assert os.getpid() in scanned_pids(scanner)
+    assert os.getpid() not in scanned_pids(scanner)
+
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(5)"])
+    try:
+        assert child.pid in scanned_pids(scanner)
+    finally:
+        child.kill()
+        child.wait()
+
+    scanner.forget()
+    assert os.getpid() in scanned_pids(scanner)
+
+
+def test_psutil_scanner_is_default(monkeypatch):
+    monkeypatch.delenv("EPIC_PROCESS_SCANNER", raising=False)
+    assert isinstance(create_process_scanner(), PsutilProcessScanner)
+
+
+@linux_only
+def test_procfs_scanner_is_opt_in(monkeypatch):
+    monkeypatch.setenv("EPIC_PROCESS_SCANNER", "procfs")
+    assert isinstance(create_process_scanner(), ProcfsProcessScanner)
@@ -0,0 +1,50 @@
+import subprocess
+import sys
+
+import psutil
+import pytest
+
+import process_snapshot
+from process_snapshot import ProcessTableSnapshot
+
+
+@pytest.fixture
+def child():
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    yield psutil.Process(child.pid)
+    child.kill()
+    child.wait()
+
+
+def test_children_are_read_once(child):
+    snapshot = ProcessTableSnapshot()
+    assert child in snapshot.children(psutil.Process())
+    assert snapshot.table_walks == 1
+
+    assert child in snapshot.children(psutil.Process(), recursive=True)
+    assert (snapshot.table_walks, snapshot.table_walks_saved) == (1, 1)
+
+
+def test_process_table_is_walked_once(child, mocker):
+    ppid_map = mocker.patch("process_snapshot._ppid_map", side_effect=process_snapshot._ppid_map)
+    snapshot = ProcessTableSnapshot()
+    snapshot.children(psutil.Process())
+    snapshot.children(psutil.Process(), recursive=True)
+    snapshot.children(child)
+    assert ppid_map.call_count == 1
+
+
+def test_children_without_ppid_map(child, mocker):
+    mocker.patch("process_snapshot._ppid_map", None)
+    assert child in ProcessTableSnapshot().children(psutil.Process())
+
+
+def test_is_alive_is_kept_for_snapshot_lifetime(child):
+    snapshot = ProcessTableSnapshot()
+    assert snapshot.is_alive(child)
+    child.kill()
+    child.wait()
+    assert snapshot.is_alive(child)
+    assert (snapshot.status_reads, snapshot.status_reads_saved) == (1, 1)
+
+    assert not ProcessTableSnapshot().is_alive(child)
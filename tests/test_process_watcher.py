@@ -1,4 +1,17 @@
-from process_watcher import WatchedApp
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from unittest.mock import MagicMock
+
+import psutil
+import pytest
+from galaxy.unittest.mock import AsyncMock
+
+from consts import LAUNCHER_PROCESS_IDENTIFIER
+from exit_watcher import PidfdExitWatcher
+from process_watcher import ProcessWatcher, WatchedApp, _ChildProcessCache
 
 
 def test_watched_games_setter(process_watcher):
@@ -12,3 +25,198 @@ def test_watched_games_setter(process_watcher):
         WatchedApp("Abu", "D:\\Games\\Rome"): set()
     }
     assert expected == process_watcher.watched_games
+
+
+def fake_process(exe):
+    proc = MagicMock()
+    proc.exe.return_value = exe
+    return proc
+
+
+def test_match_process_by_install_dir(process_watcher):
+    root = os.path.join(os.sep, "Games")
+    process_watcher.watched_games = {
+        "Min": os.path.join(root, "Minit"),
+        "Dill": os.path.join(root, "Minit", "Transistor") + os.sep
+    }
+    game = fake_process(os.path.join(root, "Minit", "Transistor", "bin", "Transistor.exe"))
+    other = fake_process(os.path.join(root, "Minitaur", "Minitaur.exe"))
+    launcher = fake_process(os.path.join(root, "Epic", LAUNCHER_PROCESS_IDENTIFIER))
+
+    for proc in [game, other, launcher]:
+        process_watcher._ProcessWatcher__match_process(proc)
+
+    assert process_watcher._watched_apps["Dill"] == {game}
+    assert process_watcher._watched_apps["Min"] == set()
+    assert process_watcher._launcher == {launcher}
+    game.exe.assert_called_once_with()
+
+
+@pytest.mark.skipif(not PidfdExitWatcher.is_supported(), reason="requires pidfd")
+@pytest.mark.asyncio
+async def test_process_exit_is_reported_without_polling(process_watcher, mocker):
+    process_watcher.watched_games = {"Game": os.path.dirname(os.path.realpath(sys.executable))}
+    process_watcher.on_process_exit = MagicMock()
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        process_watcher._ProcessWatcher__match_process(psutil.Process(child.pid))
+        assert process_watcher._get_running_games() == {"Game"}
+
+        is_running = mocker.spy(psutil.Process, "is_running")
+        assert process_watcher._get_running_games() == {"Game"}
+        is_running.assert_not_called()
+
+        child.kill()
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if process_watcher.on_process_exit.called:
+                break
+        process_watcher.on_process_exit.assert_called_once_with("Game")
+        assert process_watcher._watched_apps["Game"] == set()
+    finally:
+        child.kill()
+        child.wait()
+        process_watcher._exit_watcher.close()
+
+
+def test_child_cache_is_bounded_lru():
+    cache = _ChildProcessCache(max_size=2)
+    cache.put((1, 10.0), "proc1", None)
+    cache.put((2, 20.0), "proc2", "Min")
+    assert cache.get((1, 10.0)) == ("proc1", None)
+    cache.put((3, 30.0), "proc3", None)
+
+    assert cache.get((2, 20.0)) is None
+    assert cache.get((1, 10.0)) == ("proc1", None)
+    # reused pid
+    assert cache.get((1, 11.0)) is None
+
+    cache.retain({(3, 30.0)})
+    assert len(cache) == 1
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (2, 2, 2)
+    assert stats['hit_rate'] == 0.5
+    assert stats['memory_bytes'] > 0
+
+
+def test_search_in_children_uses_cache(process_watcher):
+    process_watcher._exit_watcher = None
+    root = os.path.join(os.sep, "Games")
+    process_watcher.watched_games = {"Min": os.path.join(root, "Minit")}
+    game = fake_process(os.path.join(root, "Minit", "Minit.exe"))
+    helper = fake_process(os.path.join(root, "Epic", "CrashReporter.exe"))
+    game.pid, game.create_time.return_value = 10, 100.0
+    helper.pid, helper.create_time.return_value = 11, 100.0
+    launcher = fake_process(os.path.join(root, "Epic", LAUNCHER_PROCESS_IDENTIFIER))
+    snapshot = MagicMock()
+    snapshot.age = 0
+    snapshot.children.return_value = [game, helper]
+    process_watcher._snapshot = snapshot
+
+    assert process_watcher._search_in_children({launcher})
+    assert process_watcher._search_in_children({launcher})
+    assert process_watcher._watched_apps["Min"] == {game}
+    game.exe.assert_called_once_with()
+    helper.exe.assert_called_once_with()
+
+    snapshot.children.return_value = [helper]
+    assert not process_watcher._search_in_children({launcher})
+    assert process_watcher.child_cache_stats['size'] == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("budget, pauses", [(10, 0), (0, 50)])
+async def test_search_in_all_slowly_works_in_slices(process_watcher, mocker, budget, pauses):
+    process_watcher._exit_watcher = None
+    process_watcher.watched_games = {"Min": os.path.join(os.sep, "Games", "Minit")}
+    scanned = [(i, os.path.join(os.sep, "usr", "bin", f"daemon{i}")) for i in range(49)]
+    scanned.append((49, os.path.join(os.sep, "Games", "Minit", "Minit.exe")))
+    process_watcher._scanner = MagicMock()
+    process_watcher._scanner.scan.return_value = iter(scanned)
+    process_watcher._scanner.process.side_effect = lambda handle: handle
+    sleep = mocker.patch("process_watcher.asyncio.sleep", new_callable=AsyncMock)
+
+    await process_watcher._search_in_all_slowly(budget=budget)
+
+    assert process_watcher._watched_apps["Min"] == {49}
+    assert sleep.call_count == pauses
+
+
+def test_match_process_by_launch_executable(process_watcher):
+    process_watcher._exit_watcher = None
+    root = os.path.join(os.sep, "Games")
+    process_watcher.watched_games = {"Min": os.path.join(root, "Minit"), "Dill": os.path.join(root, "Transistor")}
+    process_watcher.launch_executables = {"Min": os.path.join(root, "Minit", "Minit.exe")}
+    game = fake_process(os.path.join(root, "Minit", "Minit.exe"))
+    crash_reporter = fake_process(os.path.join(root, "Transistor", "Engine", "CrashReportClient.exe"))
+    anti_cheat = fake_process(os.path.join(root, "Minit", "EasyAntiCheat", "EasyAntiCheat_Setup.exe"))
+    shipping = fake_process(os.path.join(root, "Transistor", "Binaries", "Transistor-Win64-Shipping.exe"))
+
+    for proc in [game, crash_reporter, anti_cheat, shipping]:
+        process_watcher._ProcessWatcher__match_process(proc)
+
+    assert process_watcher._watched_apps["Min"] == {game}
+    assert process_watcher._watched_apps["Dill"] == {shipping}
+
+
+@pytest.mark.asyncio
+async def test_pool_until_game_start_backs_off(process_watcher, mocker):
+    process_watcher._exit_watcher = None
+    process_watcher.watched_games = {"Min": os.path.join(os.sep, "Games", "Minit")}
+    mocker.patch.object(process_watcher, "_is_launcher_tracked_and_running", return_value=True)
+
+    def search_in_children(_):
+        if search.call_count == 6:
+            process_watcher._watched_apps["Min"].add(1)
+    search = mocker.patch.object(process_watcher, "_search_in_children", side_effect=search_in_children)
+    sleep = mocker.patch("process_watcher.asyncio.sleep", new_callable=AsyncMock)
+
+    assert await process_watcher.pool_until_game_start("Min", timeout=30, sint=0.5, lint=2, burst_duration=0)
+
+    assert [c[0][0] for c in sleep.call_args_list] == [0.05, 0.1, 0.2, 0.4, 0.5]
+    assert process_watcher.launch_latencies["Min"].count == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_until_game_start_bursts_after_launcher_is_found(process_watcher, mocker):
+    process_watcher._exit_watcher = None
+    process_watcher.watched_games = {"Min": os.path.join(os.sep, "Games", "Minit")}
+    clock = [1000.0]
+    mocker.patch("process_watcher.time.time", side_effect=lambda: clock[0])
+
+    async def sleep(seconds):
+        clock[0] += seconds
+    sleep = mocker.patch("process_watcher.asyncio.sleep", side_effect=sleep)
+    # cold launcher shows up only after 4 seconds, longer than the burst
+    mocker.patch.object(process_watcher, "_is_launcher_tracked_and_running", side_effect=lambda: clock[0] >= 1004)
+    mocker.patch.object(process_watcher, "_search_in_all")
+
+    def search_in_children(_):
+        if search.call_count == 6:
+            process_watcher._watched_apps["Min"].add(1)
+    search = mocker.patch.object(process_watcher, "_search_in_children", side_effect=search_in_children)
+
+    assert await process_watcher.pool_until_game_start("Min", timeout=30, sint=0.5, lint=2, burst_duration=2)
+
+    assert [c[0][0] for c in sleep.call_args_list] == [2, 2] + [0.05] * 5
+
+
+def test_restore_state(process_watcher, mocker):
+    process_watcher._exit_watcher = None
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        proc = psutil.Process(child.pid)
+        process_watcher.watched_games = {"Game": os.path.dirname(proc.exe())}
+        process_watcher._ProcessWatcher__match_process(proc)
+        state = json.loads(json.dumps(process_watcher.get_state()))
+
+        restarted = ProcessWatcher(LAUNCHER_PROCESS_IDENTIFIER)
+        restarted._exit_watcher = None
+        stale = dict(state[0], pid=child.pid, create_time=state[0]["create_time"] - 1)
+        scan = mocker.patch.object(restarted._scanner, "scan")
+        assert restarted.restore_state(state + [stale]) == 1
+        assert restarted._get_running_games() == {"Game"}
+        scan.assert_not_called()
+    finally:
+        child.kill()
+        child.wait()
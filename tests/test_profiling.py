@@ -0,0 +1,91 @@
+import asyncio
+import pstats
+import tracemalloc
+
+import pytest
+
+from profiling import Profiler
+
+
+@pytest.fixture
+def profiler(tmpdir):
+    profiler = Profiler(str(tmpdir.join('profiles')), keep=2, min_duration=0)
+    yield profiler
+    tracemalloc.stop()
+
+
+async def test_coroutine_is_profiled(profiler, tmpdir):
+    async def get_owned_games():
+        await asyncio.sleep(0)
+        return [bytearray(1024) for _ in range(100)]
+
+    games = await profiler.wrap(get_owned_games)()
+
+    assert len(games) == 100
+    files = sorted(file.basename for file in tmpdir.join('profiles').listdir())
+    assert [file.split('-', 4)[-1] for file in files] == ['get_owned_games.pstats', 'get_owned_games.tracemalloc']
+    stats = pstats.Stats(str(tmpdir.join('profiles', files[0])))
+    assert any(function == 'get_owned_games' for _, _, function in stats.stats)
+    assert tracemalloc.Snapshot.load(str(tmpdir.join('profiles', files[1]))).traces
+
+
+def test_memory_without_reset_peak(profiler, tmpdir, monkeypatch):
+    # Python 3.7 bundled with Galaxy
+    monkeypatch.delattr(tracemalloc, 'reset_peak', raising=False)
+
+    def tick():
+        return [bytearray(1024) for _ in range(100)]
+
+    profiler.wrap(tick)()
+    profiler.wrap(tick)()
+
+    assert len(tmpdir.join('profiles').listdir()) == 4
+
+
+def test_nested_calls_are_part_of_outer_profile(profiler, tmpdir):
+    @profiler.wrap
+    def get_game_time():
+        pass
+
+    @profiler.wrap
+    def tick():
+        get_game_time()
+
+    tick()
+
+    assert len(tmpdir.join('profiles').listdir()) == 2
+
+
+def test_rotation(profiler, tmpdir):
+    profiler.memory = False
+    for name in ['tick', 'get_friends', 'launch_game']:
+        def func():
+            pass
+        func.__name__ = name
+        profiler.wrap(func)()
+
+    assert sorted(file.basename.split('-', 4)[-1] for file in tmpdir.join('profiles').listdir()) == \
+        ['get_friends.pstats', 'launch_game.pstats']
+
+
+def test_short_calls_are_not_saved(profiler, tmpdir):
+    profiler.min_duration = 10
+
+    def tick():
+        pass
+
+    profiler.wrap(tick)()
+
+    assert not tmpdir.join('profiles').exists()
+
+
+def test_from_environment(monkeypatch, tmpdir):
+    assert Profiler.from_environment() is None
+    monkeypatch.setenv('EPIC_PROFILE_DIR', str(tmpdir))
+    monkeypatch.setenv('EPIC_PROFILE_KEEP', '5')
+    monkeypatch.setenv('EPIC_PROFILE_MEMORY', '0')
+
+    profiler = Profiler.from_environment()
+
+    assert (profiler.directory, profiler.keep, profiler.min_duration, profiler.memory) == \
+        (str(tmpdir), 5, Profiler.DEFAULT_MIN_DURATION, False)